@@ -0,0 +1,201 @@
+"""
+Acquisition loop of the ADC receiver without any Qt dependency.
+
+AdcAcquisition receives RAM blocks from the board into a FrameRingBuffer.
+AdcReceiverThread runs it in a QThread for the GUI, headless.py runs it
+directly.
+"""
+import time
+
+import numpy as np
+
+from BoardConnection import board_lock
+from FrameBuffer import FrameRingBuffer
+from PipelineStats import pipeline_stats
+from Profiler import profiler
+
+VERBOSE = False
+
+# Pacing policies of the receive loop
+PACING_NONE = "none"  # arm the next block as soon as possible
+PACING_FIXED = "fixed"  # at most one block every frame_interval_s
+PACING_ADAPTIVE = "adaptive"  # back off only while the recorder lags behind
+ADAPTIVE_POLL_S = 0.002
+# Longest sleep of a paced loop before it checks whether it was stopped
+STOP_POLL_S = 0.05
+FPS_SMOOTHING = 0.1
+
+
+class AdcAcquisition:
+    """
+    Receive loop filling a FrameRingBuffer with ADC frames.
+
+    :param board: Board client, e.g. a RedPitayaBoard or a RedPitayaEmulator board.
+    :param init_adc: ADC setup function of the board, e.g. source.initAdcReceiver.
+    :param on_frame: Called with the sequence number of every committed frame,
+        in the acquisition thread.
+    """
+
+    def __init__(self, board=None, init_adc=None, on_frame=None):
+        self.board = board
+        self.init_adc = init_adc
+        self.on_frame = on_frame
+        self.profile_name = "receiver"
+        self.running = False
+        self.sample_rate = None
+        self.mode = None
+        self.dac_steps = None
+        self.dwell_time_ms = None
+        self.ram_size = None
+        self.ring = FrameRingBuffer()
+        self.stats = pipeline_stats
+
+        # acquisition options, pipelined: arm the next block as soon as the
+        # frame is handed over instead of once the reader has read it
+        self.pipelined = True
+        self.pacing = PACING_ADAPTIVE
+        self.frame_interval_s = 0.1
+        self.measured_fps = 0.0
+        self.last_arm_time = 0.0
+
+        # CaptureRecorder the frames are also written to, if set
+        self.recorder = None
+        # PeriodAverager every frame is averaged into, if set
+        self.averager = None
+
+    def set_parameters(self, sample_rate, mode, dac_steps, dwell_time_ms, ram_size=None):
+        self.sample_rate, self.mode, self.dac_steps, self.dwell_time_ms = (
+            sample_rate, mode, dac_steps, dwell_time_ms
+        )
+        self.ram_size = ram_size
+
+    def set_acquisition_options(self, pipelined=True, pacing=PACING_ADAPTIVE, frame_interval_s=0.1):
+        """Can be changed while running, the receive loop picks it up with the next block"""
+
+        self.pipelined, self.pacing, self.frame_interval_s = (
+            pipelined, pacing, frame_interval_s
+        )
+
+    def receive_into(self, view):
+        """Receive len(view) bytes of ADC data straight into the given ring slot view."""
+
+        receive_into = getattr(self.board, "receive_adc_data_package_into", None)
+        if receive_into is not None:
+            receive_into(view)
+        else:
+            # The client only hands out bytes objects, copy once into the slot
+            view[:] = np.frombuffer(
+                self.board.receive_adc_data_package(len(view)), dtype=np.uint8
+            )
+
+    def acquire(self):
+        """Receive frames into the ring until stop() is called"""
+
+        self.running = True
+        lock = board_lock(self.board)
+        with lock:
+            self.config_adc = self.init_adc(
+                self.board,
+                self.sample_rate,
+                self.mode,
+                self.dac_steps,
+                self.dwell_time_ms,
+                VERBOSE,
+            )
+        self.number_tcp_pkg = self.config_adc["adc"]["tcp"]
+        self.tcp_pkg_size_bytes = int(self.config_adc["ram"].tcp_pkg_size_bytes)
+
+        # One ring slot holds a complete RAM block, it is filled two packages at a time
+        self.ring.resize(self.number_tcp_pkg * self.tcp_pkg_size_bytes)
+        self.chunk_bytes = 2 * self.tcp_pkg_size_bytes
+        self.measured_fps = 0.0
+        self.last_frame_time = None
+
+        while self.running:
+            profiler.check(self.profile_name)
+            stats = self.stats if self.stats.enabled else None
+            # Nothing else may talk to the board between arming and receiving a block
+            with lock:
+                self.arm_adc()
+                if stats is not None:
+                    receive_start = time.monotonic()
+                self.receive_block(self.ring.writable_slot())
+            if stats is not None:
+                stats.record("receive", time.monotonic() - receive_start)
+            seq = self.ring.commit(self.sample_rate)
+            if stats is not None:
+                stats.record_queue(self.ring.backlog(), self.ring.frames_dropped)
+            if self.on_frame is not None:
+                self.on_frame(seq)
+            recorder = self.recorder
+            if recorder is not None:
+                recorder.submit(
+                    self.ring, seq, self.sample_rate, self.mode,
+                    self.dac_steps, self.dwell_time_ms,
+                )
+            averager = self.averager
+            if averager is not None and self.mode == "Sync":
+                averager.add(
+                    self.ring, seq, self.sample_rate, self.dac_steps, self.dwell_time_ms
+                )
+            self.update_measured_fps()
+            if self.running:
+                self.pace()
+        profiler.stop_thread(self.profile_name)
+
+    def arm_adc(self):
+        self.last_arm_time = time.monotonic()
+        self.board.start_adc_sampling(self.number_tcp_pkg)
+
+    def receive_block(self, slot):
+        for offset in range(0, self.ring.frame_bytes, self.chunk_bytes):
+            self.receive_into(slot[offset:offset + self.chunk_bytes])
+
+    def pace(self):
+        """Wait before arming the next block, according to the pacing policy"""
+
+        if not self.pipelined:
+            # Lock step: the reader processes the frame while the board is idle
+            while self.running and self.ring.backlog():
+                time.sleep(ADAPTIVE_POLL_S)
+        if self.pacing == PACING_FIXED:
+            self.sleep_until(self.last_arm_time + self.frame_interval_s)
+        elif self.pacing == PACING_ADAPTIVE:
+            # Give a lagging recorder up to one frame interval to catch up. The
+            # display only draws the newest frame, frames it skips are no lag.
+            deadline = time.monotonic() + self.frame_interval_s
+            while (
+                self.running
+                and self.recorder_lag() >= self.ring.n_slots // 2
+                and time.monotonic() < deadline
+            ):
+                time.sleep(ADAPTIVE_POLL_S)
+
+    def sleep_until(self, deadline):
+        """Sleep until time.monotonic() reaches deadline or stop() is called"""
+
+        while self.running:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return
+            time.sleep(min(remaining, STOP_POLL_S))
+
+    def recorder_lag(self):
+        """Frames submitted to the recorder that it has not written yet"""
+
+        recorder = self.recorder
+        return 0 if recorder is None else recorder.queue.qsize()
+
+    def update_measured_fps(self):
+        now = time.monotonic()
+        if self.last_frame_time is not None:
+            fps = 1 / max(now - self.last_frame_time, 1e-9)
+            if self.measured_fps:
+                fps = (1 - FPS_SMOOTHING) * self.measured_fps + FPS_SMOOTHING * fps
+            self.measured_fps = fps
+        self.last_frame_time = now
+
+    def stop(self):
+        """Let the loop end after the current block"""
+
+        self.running = False
@@ -1,57 +1,50 @@
 from PyQt6.QtCore import QThread, pyqtSignal
-import time
+from functools import partial
 
 from rp.core import RedPitayaBoard
 from source import initAdcReceiver
+from BoardConnection import LazyBoard
+from Acquisition import (
+    AdcAcquisition,
+    PACING_NONE,
+    PACING_FIXED,
+    PACING_ADAPTIVE,
+)
 
 DEBUG_MODE = False
 VERBOSE = False
 autoStartServer = False
 
-pita = RedPitayaBoard(
-    debug=DEBUG_MODE, verbose=VERBOSE, autoStartServer=autoStartServer
+# Connects on first use (or pita.warm_up()), not at import time
+pita = LazyBoard(
+    partial(
+        RedPitayaBoard,
+        debug=DEBUG_MODE,
+        verbose=VERBOSE,
+        autoStartServer=autoStartServer,
+    )
 )
 
 class AdcReceiverThread(QThread):
-    dataReceived = pyqtSignal(bytes)
+    """Runs an AdcAcquisition in its own QThread, frames are announced with frameReady"""
+
+    # Only the sequence number of a frame crosses the thread boundary,
+    # the samples themselves stay in acquisition.ring
+    frameReady = pyqtSignal(int)
 
-    def __init__(self):
+    def __init__(self, board=None, init_adc=initAdcReceiver):
         super().__init__()
-        self.running = False
-        self.sample_rate = None
-        self.mode = None
-        self.dac_steps = None
-        self.dwell_time_ms = None
-
-    def set_parameters(self, sample_rate, mode, dac_steps, dwell_time_ms):
-        self.sample_rate, self.mode, self.dac_steps, self.dwell_time_ms = (
-            sample_rate, mode, dac_steps, dwell_time_ms
+        # board client and its ADC setup function, e.g. a RedPitayaEmulator board
+        self.acquisition = AdcAcquisition(
+            pita if board is None else board, init_adc, on_frame=self.frameReady.emit
         )
 
+    def set_parameters(self, sample_rate, mode, dac_steps, dwell_time_ms, ram_size=None):
+        self.acquisition.set_parameters(sample_rate, mode, dac_steps, dwell_time_ms, ram_size)
+
     def run(self):
-        self.running = True
-        self.config_adc = initAdcReceiver(
-            pita,
-            self.sample_rate,
-            self.mode,
-            self.dac_steps,
-            self.dwell_time_ms,
-            VERBOSE,
-        )
-        self.number_tcp_pkg = self.config_adc["adc"]["tcp"]
-        self.tcp_pkg_size_bytes = self.config_adc["ram"].tcp_pkg_size_bytes
-
-        while self.running:
-            pita.start_adc_sampling(self.number_tcp_pkg)
-            index = 0
-            while index < self.number_tcp_pkg:
-                data_raw = pita.receive_adc_data_package(
-                    2 * int(self.tcp_pkg_size_bytes)
-                )
-                self.dataReceived.emit(data_raw)
-                index += 2
-                time.sleep(0.1)
+        self.acquisition.acquire()
 
     def stop(self):
-        self.running = False
+        self.acquisition.stop()
         self.wait()
@@ -0,0 +1,89 @@
+from functools import lru_cache
+
+import numpy as np
+
+ADC_BITS = 14
+ADC_FULL_SCALE_V = 1.0
+# Full scale voltage of the input range set by the jumpers of the board
+ADC_INPUT_RANGES = {"LV (±1 V)": 1.0, "HV (±20 V)": 20.0}
+CODE_MASK = (1 << ADC_BITS) - 1
+CHANNEL2_SHIFT = 16  # channel 1 sits in the low, channel 2 in the high half word
+
+
+@lru_cache(maxsize=8)
+def volts_per_code_table(dtype_name="float64", full_scale_v=ADC_FULL_SCALE_V):
+    """
+    Lookup table from an unsigned 14 bit ADC code to its voltage.
+
+    Codes are two's complement, so codes above 8191 are negative voltages.
+    The table is cached and read-only.
+    """
+    codes = np.arange(1 << ADC_BITS)
+    signed = np.where(codes >= 1 << (ADC_BITS - 1), codes - (1 << ADC_BITS), codes)
+    table = (signed * (full_scale_v / (1 << (ADC_BITS - 1)))).astype(dtype_name)
+    table.setflags(write=False)
+    return table
+
+
+class AdcUnpacker:
+    """
+    Split packed int32 ADC words into the voltages of both channels.
+
+    All intermediate and output arrays are allocated once and reused while the
+    number of words per frame stays the same, so unpacking a frame does not
+    allocate. The returned arrays are overwritten by the next call.
+    """
+
+    def __init__(self, dtype=np.float64, full_scale_v=ADC_FULL_SCALE_V):
+        self.dtype = np.dtype(dtype)
+        self.set_full_scale(full_scale_v)
+        self.resize(0)
+
+    def set_full_scale(self, full_scale_v):
+        """Scale codes to the input range with this full scale voltage, see ADC_INPUT_RANGES"""
+
+        self.full_scale_v = full_scale_v
+        self.table = volts_per_code_table(self.dtype.name, full_scale_v)
+
+    def resize(self, n_words):
+        """Allocate the code and channel buffers for frames of n_words words."""
+
+        self.n_words = n_words
+        self.codes = np.empty(n_words, dtype=np.int32)
+        self.ch1 = np.empty(n_words, dtype=self.dtype)
+        self.ch2 = np.empty(n_words, dtype=self.dtype)
+
+    def unpack(self, words, ch1=None, ch2=None):
+        """
+        Unpack a frame of packed words.
+
+        :param words: int32 array of packed ADC words.
+        :param ch1: Optional preallocated output array for channel 1.
+        :param ch2: Optional preallocated output array for channel 2.
+
+        :return: Channel 1 and channel 2 voltages.
+        """
+        if len(words) != self.n_words:
+            self.resize(len(words))
+        ch1 = self.ch1 if ch1 is None else ch1
+        ch2 = self.ch2 if ch2 is None else ch2
+
+        np.bitwise_and(words, CODE_MASK, out=self.codes)
+        np.take(self.table, self.codes, out=ch1, mode="clip")
+        np.right_shift(words, CHANNEL2_SHIFT, out=self.codes)
+        np.bitwise_and(self.codes, CODE_MASK, out=self.codes)
+        np.take(self.table, self.codes, out=ch2, mode="clip")
+        return ch1, ch2
+
+
+def pack_adc_words(ch1, ch2, full_scale_v=ADC_FULL_SCALE_V):
+    """
+    Inverse of AdcUnpacker.unpack: pack two channel voltages into int32 words.
+
+    Voltages are clipped to the ADC range. Used to produce synthetic frames.
+    """
+    max_code = (1 << (ADC_BITS - 1)) - 1
+    scale = (1 << (ADC_BITS - 1)) / full_scale_v
+    codes1 = np.clip(np.round(np.asarray(ch1) * scale), -max_code - 1, max_code).astype(np.int32)
+    codes2 = np.clip(np.round(np.asarray(ch2) * scale), -max_code - 1, max_code).astype(np.int32)
+    return (codes1 & CODE_MASK) | ((codes2 & CODE_MASK) << CHANNEL2_SHIFT)
@@ -0,0 +1,152 @@
+import asyncio
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+from PyQt6.QtCore import QObject, pyqtSignal
+
+from source import stop_sweep
+from AdcReceiver import pita
+from BoardConnection import board_lock
+from DacWaveformCache import dac_waveforms
+
+
+class AsyncBoardClient:
+    """
+    Awaitable facade over the blocking board client.
+
+    Every call runs on the single board-io worker thread, so awaiting it never
+    blocks the event loop, and calls are executed one after the other in the
+    order they were awaited. The worker holds the board lock (see board_lock)
+    for each call, so they also never interleave with the acquisition loop or
+    anyone else using the same board. Attributes of the board are looked up on
+    the worker thread too, so the first call of a LazyBoard connects there and
+    not on the loop.
+    """
+
+    def __init__(self, board=pita, waveforms=dac_waveforms):
+        self.board = board
+        self.waveforms = waveforms
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="board-io")
+
+    async def run(self, function, *args, **kwargs):
+        """Run a blocking function that talks to the board"""
+
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(self.executor, lambda: self.locked(function, *args, **kwargs))
+
+    def locked(self, function, *args, **kwargs):
+        with board_lock(self.board):
+            return function(*args, **kwargs)
+
+    async def call(self, method, *args, **kwargs):
+        """Call a method of the board by name"""
+
+        return await self.run(lambda: getattr(self.board, method)(*args, **kwargs))
+
+    async def set_adc_sample_rate(self, sample_rate):
+        return await self.call("set_adc_sample_rate", sample_rate)
+
+    # The lock is released between these two, only await them while no
+    # AdcAcquisition is receiving from the same board
+    async def start_adc_sampling(self, number_tcp_pkg):
+        return await self.call("start_adc_sampling", number_tcp_pkg)
+
+    async def receive_adc_data_package(self, nbytes):
+        return await self.call("receive_adc_data_package", nbytes)
+
+    async def start_dac_sweep(self, *args, **kwargs):
+        return await self.call("start_dac_sweep", *args, **kwargs)
+
+    async def stop_dac_sweep(self, *args, **kwargs):
+        return await self.call("stop_dac_sweep", *args, **kwargs)
+
+    async def upload_waveform(self, signal_type, amplitude, start_V, stop_V, dac_steps, dwell_time_ms, channel):
+        """Load a waveform through the waveform cache, see DacWaveformCache.upload"""
+
+        return await self.run(
+            self.waveforms.upload,
+            self.board,
+            signal_type,
+            amplitude,
+            start_V,
+            stop_V,
+            dac_steps,
+            dwell_time_ms,
+            channel,
+        )
+
+    async def stop_sweep(self, channel, reset_voltage):
+        await self.run(stop_sweep, self.board, channel, reset_voltage)
+        self.waveforms.invalidate(channel)
+
+    async def stop_receiver(self, receiver):
+        """Stop an AdcReceiverThread and wait until its loop has ended"""
+
+        receiver.acquisition.stop()
+        loop = asyncio.get_running_loop()
+        # Without the board lock, the loop needs it to finish its last block
+        await loop.run_in_executor(self.executor, receiver.wait)
+
+    async def reconfigure(self, stops=(), configs=(), receiver=None):
+        """
+        Stop the sweeps, then upload the waveforms, one after the other.
+
+        :param stops: (channel, reset voltage) of each port to stop.
+        :param configs: Arguments of upload_waveform of each port to load.
+        :param receiver: AdcReceiverThread to stop before anything is sent.
+        :return: upload_waveform result of each config.
+        """
+        if receiver is not None:
+            await self.stop_receiver(receiver)
+        for channel, reset_voltage in stops:
+            await self.stop_sweep(channel, reset_voltage)
+        return [await self.upload_waveform(*config) for config in configs]
+
+    def close(self):
+        # Lets an upload in flight finish before the board is closed
+        self.executor.shutdown(wait=True)
+
+
+class AsyncBoardBridge(QObject):
+    """
+    Runs an asyncio event loop next to the Qt event loop.
+
+    The loop lives in its own daemon thread. submit() schedules a coroutine on it
+    from the GUI thread and returns at once; the result comes back through the
+    finished or failed signal, which Qt delivers in the GUI thread.
+    """
+
+    finished = pyqtSignal(str, object)
+    failed = pyqtSignal(str, str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run_loop, name="board-asyncio", daemon=True)
+        self.thread.start()
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    def submit(self, name, coroutine):
+        """
+        Run coroutine on the asyncio loop, name identifies it in the signals.
+
+        :return: A concurrent.futures.Future of the result.
+        """
+        future = asyncio.run_coroutine_threadsafe(coroutine, self.loop)
+        future.add_done_callback(lambda done: self.report(name, done))
+        return future
+
+    def report(self, name, future):
+        if future.cancelled():
+            self.failed.emit(name, "cancelled")
+        elif future.exception() is not None:
+            self.failed.emit(name, repr(future.exception()))
+        else:
+            self.finished.emit(name, future.result())
+
+    def close(self):
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=1)
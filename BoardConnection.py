@@ -0,0 +1,84 @@
+import contextlib
+import threading
+import time
+
+
+def board_lock(board):
+    """
+    Lock to hold while exchanging messages with board.
+
+    Everyone using the same LazyBoard shares its io_lock, so the acquisition
+    loop, DAC uploads and sweep commands never interleave on the connection.
+    Other board objects have no lock and must be used from one thread only.
+    """
+    lock = getattr(board, "io_lock", None)
+    return lock if lock is not None else contextlib.nullcontext()
+
+
+class LazyBoard:
+    """
+    Board client that connects on first use.
+
+    Attribute access is forwarded to the board session created by `factory`,
+    so a LazyBoard can be used wherever a RedPitayaBoard is expected. The session
+    is created once, either on the first attribute access or in the background
+    by warm_up(), and then reused. The board talks over a single connection,
+    hold io_lock (see board_lock) for every exchange with it.
+    """
+
+    def __init__(self, factory):
+        self.factory = factory
+        self.session = None
+        self.lock = threading.Lock()
+        self.io_lock = threading.RLock()
+        self.warm_up_thread = None
+        self.connect_duration_s = None
+        self.connect_error = None
+
+    @property
+    def is_connected(self):
+        return self.session is not None
+
+    def connect(self):
+        """Return the board session, connecting first if necessary"""
+
+        session = self.session
+        if session is None:
+            with self.lock:
+                if self.session is None:
+                    start = time.perf_counter()
+                    self.session = self.factory()
+                    self.connect_duration_s = time.perf_counter() - start
+                    self.connect_error = None
+                session = self.session
+        return session
+
+    def warm_up(self):
+        """Start connecting in a background thread, e.g. while the window paints"""
+
+        if self.session is None and self.warm_up_thread is None:
+            self.warm_up_thread = threading.Thread(
+                target=self.connect_in_background, name="board-warm-up", daemon=True
+            )
+            self.warm_up_thread.start()
+
+    def connect_in_background(self):
+        try:
+            self.connect()
+        except Exception as error:
+            # Kept for inspection, the next use of the board tries again
+            self.connect_error = error
+        finally:
+            self.warm_up_thread = None
+
+    def close(self):
+        """Close the session if there is one, the next use connects again"""
+
+        with self.io_lock, self.lock:
+            if self.session is not None:
+                self.session.close()
+                self.session = None
+
+    def __getattr__(self, name):
+        # Only called for attributes LazyBoard does not have itself
+        return getattr(self.connect(), name)
@@ -0,0 +1,304 @@
+"""
+Acquisition from several boards side by side.
+
+Every board gets its own LazyBoard session and an AdcAcquisition running in its
+own thread, so the boards are read in parallel; the receive calls block in
+socket reads, which release the GIL. Committed frames of all boards go to one
+FrameBus, which groups them into AlignedFrames by their commit time. Nothing in
+here imports Qt.
+"""
+import collections
+import queue
+import threading
+import time
+
+from Acquisition import AdcAcquisition
+from BoardConnection import LazyBoard
+from PipelineStats import PipelineStats
+
+DEFAULT_ALIGN_TOLERANCE_S = 0.005
+# A board without a frame for this long is left out of the alignment
+DEFAULT_BOARD_TIMEOUT_S = 1.0
+DEFAULT_MAX_PENDING = 64
+DEFAULT_MAX_QUEUED = 256
+
+
+class AlignedFrame:
+    """
+    One frame of every board, taken at about the same time.
+
+    :ivar timestamp: Mean commit time of the frames (time.monotonic()).
+    :ivar seqs: Board name -> sequence number in the ring of that board.
+    """
+
+    def __init__(self, timestamp, seqs):
+        self.timestamp = timestamp
+        self.seqs = seqs
+
+    def __repr__(self):
+        return f"AlignedFrame({self.timestamp:.6f}, {self.seqs})"
+
+
+class FrameBus:
+    """
+    Merges the frames of several boards into AlignedFrames.
+
+    submit() is called from the acquisition threads with the commit time of a
+    frame. Once every live board has a pending frame the oldest ones are
+    compared: if they lie within tolerance_s of each other they are published
+    together, otherwise the frames too old to match the newest head are dropped
+    and counted in unaligned. offsets_s corrects a constant latency difference
+    between boards, it is subtracted from their timestamps.
+
+    A board is no longer waited for once drop_board() was called for it or it
+    sent no frame for timeout_s, it joins again with its next frame. At most
+    max_pending frames wait per board and max_queued AlignedFrames wait for
+    get(), the oldest ones are dropped beyond that (unaligned, overflowed).
+    """
+
+    def __init__(
+        self,
+        board_names,
+        tolerance_s=DEFAULT_ALIGN_TOLERANCE_S,
+        offsets_s=None,
+        timeout_s=DEFAULT_BOARD_TIMEOUT_S,
+        max_pending=DEFAULT_MAX_PENDING,
+        max_queued=DEFAULT_MAX_QUEUED,
+    ):
+        self.board_names = list(board_names)
+        self.tolerance_s = tolerance_s
+        self.timeout_s = timeout_s
+        self.offsets_s = dict.fromkeys(self.board_names, 0.0)
+        self.offsets_s.update(offsets_s or {})
+        self.pending = {name: collections.deque(maxlen=max_pending) for name in self.board_names}
+        self.live = set(self.board_names)
+        self.last_submit = dict.fromkeys(self.board_names, time.monotonic())
+        self.unaligned = dict.fromkeys(self.board_names, 0)
+        self.timed_out = dict.fromkeys(self.board_names, 0)
+        self.aligned = 0
+        self.overflowed = 0
+        self.lock = threading.Lock()
+        self.frames = queue.Queue(max_queued)
+
+    def submit(self, name, seq, timestamp):
+        with self.lock:
+            now = time.monotonic()
+            self.last_submit[name] = now
+            self.live.add(name)
+            frames = self.pending[name]
+            if len(frames) == frames.maxlen:
+                self.unaligned[name] += 1
+            frames.append((timestamp - self.offsets_s[name], seq))
+            for other in list(self.live):
+                if now - self.last_submit[other] > self.timeout_s:
+                    self.timed_out[other] += 1
+                    self.leave(other)
+            self.align()
+
+    def drop_board(self, name):
+        """Stop waiting for the frames of board name, e.g. because it failed"""
+
+        with self.lock:
+            self.leave(name)
+            self.align()
+
+    def leave(self, name):
+        self.live.discard(name)
+        self.unaligned[name] += len(self.pending[name])
+        self.pending[name].clear()
+
+    def align(self):
+        while self.live and all(self.pending[name] for name in self.live):
+            heads = {name: self.pending[name][0] for name in self.live}
+            newest = max(timestamp for timestamp, _ in heads.values())
+            stale = [name for name, (timestamp, _) in heads.items() if newest - timestamp > self.tolerance_s]
+            if stale:
+                for name in stale:
+                    self.pending[name].popleft()
+                    self.unaligned[name] += 1
+                continue
+            for name in heads:
+                self.pending[name].popleft()
+            timestamp = sum(timestamp for timestamp, _ in heads.values()) / len(heads)
+            self.publish(AlignedFrame(timestamp, {name: seq for name, (_, seq) in heads.items()}))
+            self.aligned += 1
+
+    def publish(self, frame):
+        while True:
+            try:
+                self.frames.put_nowait(frame)
+                return
+            except queue.Full:
+                # Nobody is reading, keep the newest frames
+                try:
+                    self.frames.get_nowait()
+                    self.overflowed += 1
+                except queue.Empty:
+                    pass
+
+    def get(self, timeout=None):
+        """Next AlignedFrame, or None after timeout seconds"""
+
+        try:
+            return self.frames.get(timeout=timeout)
+        except queue.Empty:
+            return None
+
+
+class BoardSession:
+    """A board, its acquisition loop and the thread running it"""
+
+    def __init__(self, name, board, init_adc):
+        self.name = name
+        self.board = board
+        self.acquisition = AdcAcquisition(board, init_adc)
+        self.acquisition.profile_name = f"receiver-{name}"
+        # Every board has its own statistics, the global pipeline_stats is the GUI's
+        self.acquisition.stats = PipelineStats()
+        self.thread = None
+        self.error = None
+        self.start_time = None
+        self.on_error = None
+
+    def connect(self):
+        try:
+            self.board.connect()
+        except Exception as error:
+            self.error = error
+
+    def run(self):
+        try:
+            self.acquisition.acquire()
+        except Exception as error:
+            # Kept for counters(), the other boards carry on
+            self.error = error
+            self.acquisition.running = False
+            if self.on_error is not None:
+                self.on_error(self, error)
+
+
+class BoardManager:
+    """
+    Owns N board sessions and reads them in parallel.
+
+        manager = BoardManager()
+        manager.add_board("left", partial(RedPitayaBoard, ...))
+        manager.add_board("right", partial(RedPitayaBoard, ...))
+        manager.set_parameters(125, "Async", 1000, 8e-06)
+        manager.start()
+        frame = manager.bus.get(timeout=1)
+        left = manager.sessions["left"].acquisition.ring.read(frame.seqs["left"])
+
+    :param align_tolerance_s: Largest commit time difference of frames that
+        are merged into one AlignedFrame.
+    :param board_timeout_s: A board without a frame for this long is not waited
+        for anymore, see FrameBus.
+    """
+
+    def __init__(self, align_tolerance_s=DEFAULT_ALIGN_TOLERANCE_S, board_timeout_s=DEFAULT_BOARD_TIMEOUT_S):
+        self.align_tolerance_s = align_tolerance_s
+        self.board_timeout_s = board_timeout_s
+        self.sessions = {}
+        self.bus = None
+
+    def add_board(self, name, factory, init_adc=None):
+        """
+        Add a board, connected on start() by calling factory().
+
+        :param init_adc: ADC setup function, source.initAdcReceiver by default.
+        """
+        if init_adc is None:
+            from source import initAdcReceiver as init_adc
+        self.sessions[name] = BoardSession(name, LazyBoard(factory), init_adc)
+        return self.sessions[name]
+
+    def set_parameters(self, sample_rate, mode, dac_steps, dwell_time_ms, ram_size=None):
+        for session in self.sessions.values():
+            session.acquisition.set_parameters(sample_rate, mode, dac_steps, dwell_time_ms, ram_size)
+
+    def set_acquisition_options(self, *args, **kwargs):
+        for session in self.sessions.values():
+            session.acquisition.set_acquisition_options(*args, **kwargs)
+
+    def start(self, offsets_s=None):
+        """
+        Connect all boards in parallel, then start one acquisition thread per board.
+
+        :raises ConnectionError: If a board could not be connected, no
+            acquisition is started then.
+        """
+        for session in self.sessions.values():
+            session.error = None
+        connecting = [
+            threading.Thread(target=session.connect, daemon=True)
+            for session in self.sessions.values()
+        ]
+        for thread in connecting:
+            thread.start()
+        for thread in connecting:
+            thread.join()
+        failed = {name: session.error for name, session in self.sessions.items() if session.error}
+        if failed:
+            raise ConnectionError(
+                "could not connect " + ", ".join(f"{name}: {error!r}" for name, error in failed.items())
+            ) from next(iter(failed.values()))
+
+        self.bus = FrameBus(self.sessions, self.align_tolerance_s, offsets_s, self.board_timeout_s)
+        for session in self.sessions.values():
+            session.acquisition.on_frame = self.frame_callback(session)
+            session.on_error = self.session_failed
+            session.thread = threading.Thread(
+                target=session.run, name=f"acquisition-{session.name}", daemon=True
+            )
+            session.start_time = time.monotonic()
+            session.thread.start()
+
+    def frame_callback(self, session):
+        ring = session.acquisition.ring
+        bus = self.bus
+
+        def on_frame(seq):
+            bus.submit(session.name, seq, ring.timestamps[seq % ring.n_slots])
+
+        return on_frame
+
+    def session_failed(self, session, error):
+        # The other boards are aligned without it from now on
+        self.bus.drop_board(session.name)
+
+    @property
+    def errors(self):
+        """Board name -> exception of the boards that failed to connect or acquire"""
+
+        return {name: session.error for name, session in self.sessions.items() if session.error}
+
+    def stop(self):
+        for session in self.sessions.values():
+            session.acquisition.stop()
+        for session in self.sessions.values():
+            if session.thread is not None:
+                session.thread.join()
+                session.thread = None
+
+    def close(self):
+        self.stop()
+        for session in self.sessions.values():
+            session.board.close()
+
+    def counters(self):
+        """Per board: frames, fps, MB/s since start(), dropped, unaligned and timed out frames, error"""
+
+        counters = {}
+        for name, session in self.sessions.items():
+            ring = session.acquisition.ring
+            elapsed = max(time.monotonic() - (session.start_time or time.monotonic()), 1e-9)
+            counters[name] = {
+                "frames": ring.frames_written,
+                "fps": session.acquisition.measured_fps,
+                "mb_per_s": ring.frames_written * (ring.frame_bytes or 0) / elapsed / 1e6,
+                "dropped": ring.frames_dropped,
+                "unaligned": self.bus.unaligned[name] if self.bus else 0,
+                "timed_out": self.bus.timed_out[name] if self.bus else 0,
+                "error": repr(session.error) if session.error else None,
+            }
+        return counters
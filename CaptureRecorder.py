@@ -0,0 +1,185 @@
+"""
+Recording of raw ADC frames to disk.
+
+A capture consists of two files next to each other:
+
+    <path>.bin      raw packed ADC words of all frames, appended back to back
+    <path>.idx.npy  one INDEX_DTYPE entry per frame (NumPy .npy format)
+
+Both are memory mapped, so any frame range can be read without loading the
+whole capture, see CaptureReader.
+"""
+import os
+import queue
+import threading
+import time
+
+import numpy as np
+
+CAPTURE_DIR_ENV = "ADC_GUI_CAPTURE_DIR"
+DEFAULT_CAPACITY_BYTES = 2 * 1024**3
+DEFAULT_MAX_FRAMES = 1_000_000
+MODES = {"Async": 0, "Sync": 1}
+
+INDEX_DTYPE = np.dtype(
+    [
+        ("frame", "<u8"),  # sequence number of the frame in the receiver ring
+        ("timestamp", "<f8"),  # wall clock time the frame was received, in s
+        ("offset", "<u8"),  # byte offset of the frame in the .bin file
+        ("nbytes", "<u4"),
+        ("sample_rate", "<f8"),  # ADC sample rate in MHz
+        ("mode", "u1"),  # MODES
+        ("dac_steps", "<u4"),
+        ("dwell_time_ms", "<f8"),
+    ]
+)
+
+
+def capture_paths(path):
+    return f"{path}.bin", f"{path}.idx.npy"
+
+
+def new_capture_path(directory=None):
+    """
+    Timestamped capture path that no existing capture uses.
+
+    :param directory: Where to put the capture, by default $ADC_GUI_CAPTURE_DIR
+        or the working directory. Created if missing.
+    """
+    directory = directory or os.environ.get(CAPTURE_DIR_ENV) or "."
+    os.makedirs(directory, exist_ok=True)
+    base = os.path.join(directory, time.strftime("capture_%Y%m%d_%H%M%S"))
+    path, counter = base, 1
+    while any(os.path.exists(name) for name in capture_paths(path)):
+        path = f"{base}_{counter}"
+        counter += 1
+    return path
+
+
+class CaptureRecorder:
+    """
+    Append frames of a FrameRingBuffer to a preallocated, memory mapped capture.
+
+    submit() only queues the sequence number, a writer thread copies the frame
+    from the ring into the mapped file. If the ring overwrote the frame before it
+    was copied, or the capture is full, the frame is counted in frames_lost.
+    """
+
+    def __init__(self, path, capacity_bytes=DEFAULT_CAPACITY_BYTES, max_frames=DEFAULT_MAX_FRAMES):
+        self.path = path
+        self.data_path, self.index_path = capture_paths(path)
+
+        try:
+            with open(self.data_path, "wb") as f:
+                if hasattr(os, "posix_fallocate"):
+                    os.posix_fallocate(f.fileno(), 0, capacity_bytes)
+                else:
+                    f.truncate(capacity_bytes)
+            self.data = np.memmap(self.data_path, dtype=np.uint8, mode="r+", shape=(capacity_bytes,))
+            self.index = np.lib.format.open_memmap(
+                self.index_path, mode="w+", dtype=INDEX_DTYPE, shape=(max_frames,)
+            )
+        except OSError:
+            # e.g. ENOSPC: do not leave a half allocated capture behind
+            for name in (self.data_path, self.index_path):
+                if os.path.exists(name):
+                    os.remove(name)
+            raise
+
+        self.bytes_written = 0
+        self.frames_written = 0
+        self.frames_lost = 0
+        self.queue = queue.SimpleQueue()
+        self.writer = threading.Thread(target=self.write_frames, name="capture-writer", daemon=True)
+        self.writer.start()
+
+    def submit(self, ring, seq, sample_rate, mode, dac_steps, dwell_time_ms):
+        """Queue frame seq of ring for writing, never blocks"""
+
+        self.queue.put((ring, seq, time.time(), sample_rate, mode, dac_steps, dwell_time_ms))
+
+    def write_frames(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                return
+            ring, seq, timestamp, sample_rate, mode, dac_steps, dwell_time_ms = item
+
+            nbytes = ring.frame_bytes
+            offset = self.bytes_written
+            if (
+                not ring.is_valid(seq)
+                or offset + nbytes > len(self.data)
+                or self.frames_written >= len(self.index)
+            ):
+                self.frames_lost += 1
+                continue
+
+            self.data[offset:offset + nbytes] = ring.buffer[seq % ring.n_slots]
+            if not ring.is_valid(seq):
+                # The receiver reused the slot while it was being copied
+                self.frames_lost += 1
+                continue
+
+            self.index[self.frames_written] = (
+                seq,
+                timestamp,
+                offset,
+                nbytes,
+                sample_rate or 0,
+                MODES.get(mode, 0),
+                dac_steps or 0,
+                dwell_time_ms or 0,
+            )
+            self.bytes_written += nbytes
+            self.frames_written += 1
+
+    def close(self):
+        """Write the remaining queued frames and shrink both files to their content"""
+
+        self.queue.put(None)
+        self.writer.join()
+
+        self.data.flush()
+        index = np.array(self.index[:self.frames_written])
+        del self.data, self.index
+        os.truncate(self.data_path, self.bytes_written)
+        np.save(self.index_path, index)
+
+
+class CaptureReader:
+    """Memory mapped access to a capture written by CaptureRecorder"""
+
+    def __init__(self, path):
+        self.path = path
+        data_path, index_path = capture_paths(path)
+        index = np.load(index_path, mmap_mode="r")
+        # A capture that was not closed still has unused, zeroed index entries
+        self.index = index[:np.count_nonzero(index["nbytes"])]
+        self.data = np.memmap(data_path, dtype=np.uint8, mode="r") if len(self.index) else None
+
+    def __len__(self):
+        return len(self.index)
+
+    def frame(self, i):
+        """Packed int32 words of frame i"""
+
+        entry = self.index[i]
+        offset, nbytes = int(entry["offset"]), int(entry["nbytes"])
+        return self.data[offset:offset + nbytes].view(np.int32)
+
+    def frames(self, start, stop):
+        """
+        Frames start to stop-1 as one (frames x words) int32 array without copying.
+
+        All frames in the range must have the same size.
+        """
+        entries = self.index[start:stop]
+        if len(entries) == 0:
+            return np.empty((0, 0), dtype=np.int32)
+        nbytes = int(entries["nbytes"][0])
+        if np.any(entries["nbytes"] != nbytes):
+            raise ValueError("Frames in the range have different sizes, use frame()")
+        offset = int(entries["offset"][0])
+        block = self.data[offset:offset + nbytes * len(entries)]
+        return block.view(np.int32).reshape(len(entries), nbytes // 4)
@@ -0,0 +1,148 @@
+import threading
+
+import numpy as np
+
+from AdcUnpacker import AdcUnpacker, ADC_FULL_SCALE_V
+
+AVERAGING_WINDOW = "window"
+AVERAGING_EXPONENTIAL = "exponential"
+
+
+def samples_per_period(sample_rate, dac_steps, dwell_time_ms):
+    """ADC samples per DAC period, ValueError if the clocks do not give an integer number"""
+
+    samples = dac_steps * dwell_time_ms * 1e3 * sample_rate
+    if round(samples) < 1 or abs(samples - round(samples)) > 1e-6 * samples:
+        raise ValueError(
+            f"{samples:g} ADC samples per DAC period, averaging needs an integer number"
+        )
+    return round(samples)
+
+
+def check_whole_periods(n_samples, samples_per_period):
+    """ValueError unless a frame of n_samples holds a whole number of periods"""
+
+    if n_samples < samples_per_period or n_samples % samples_per_period:
+        raise ValueError(
+            f"a frame of {n_samples} samples is not a whole number of "
+            f"{samples_per_period} sample periods"
+        )
+
+
+class CoherentAverager:
+    """
+    Average ADC samples taken at the same phase of the DAC period.
+
+    Every frame is reshaped to (periods x samples_per_period) and averaged over
+    the periods in one vectorised pass. The per-frame means are then combined
+    across frames in a float64 accumulator, either over the last n_frames frames
+    or exponentially with alpha = 1 / n_frames. The noise of the averaged period
+    drops with the square root of the number of periods averaged.
+
+    :param samples_per_period: ADC samples per DAC period, the ratio of the two
+        clocks has to be an integer for the phases to line up.
+    """
+
+    def __init__(self, samples_per_period, mode=AVERAGING_WINDOW, n_frames=16):
+        self.samples_per_period = int(samples_per_period)
+        self.mode = mode
+        self.n_frames = max(1, int(n_frames))
+        self.alpha = 1 / self.n_frames
+        self.reset()
+
+    def reset(self):
+        self.frames = 0
+        self.periods = 0
+        self.accumulator = np.zeros(self.samples_per_period)
+        if self.mode == AVERAGING_WINDOW:
+            self.history = np.zeros((self.n_frames, self.samples_per_period))
+
+    def update(self, samples):
+        """Add one frame of samples, returns the current average period"""
+
+        check_whole_periods(len(samples), self.samples_per_period)
+        periods = len(samples) // self.samples_per_period
+        frame_mean = (
+            samples
+            .reshape(periods, self.samples_per_period)
+            .mean(axis=0, dtype=np.float64)
+        )
+
+        if self.mode == AVERAGING_EXPONENTIAL:
+            if self.frames == 0:
+                self.accumulator[:] = frame_mean
+            else:
+                self.accumulator += self.alpha * (frame_mean - self.accumulator)
+        else:
+            # accumulator holds the running sum of the frames in the window
+            slot = self.frames % self.n_frames
+            if self.frames >= self.n_frames:
+                self.accumulator -= self.history[slot]
+            self.history[slot] = frame_mean
+            if slot == self.n_frames - 1:
+                # Recompute now and then so rounding errors do not add up
+                self.accumulator[:] = self.history.sum(axis=0)
+            else:
+                self.accumulator += frame_mean
+
+        self.frames += 1
+        self.periods += periods
+        return self.average
+
+    @property
+    def average(self):
+        if self.mode == AVERAGING_EXPONENTIAL:
+            return self.accumulator
+        return self.accumulator / max(1, min(self.frames, self.n_frames))
+
+
+class PeriodAverager:
+    """
+    Coherent averages of both channels, fed with every acquired frame.
+
+    add() is called by the acquisition loop for every committed frame, so the
+    frames the display skips are averaged as well, and averages() hands copies
+    of the current averages to the GUI. The period length follows the settings
+    of each frame: when it changes the averages start again, frames that do not
+    hold a whole number of periods are counted in frames_rejected and the reason
+    is kept in error.
+    """
+
+    def __init__(self, mode=AVERAGING_WINDOW, n_frames=16, full_scale_v=ADC_FULL_SCALE_V):
+        self.mode = mode
+        self.n_frames = n_frames
+        self.unpacker = AdcUnpacker(np.float64, full_scale_v)
+        self.channels = None
+        self.frames_rejected = 0
+        self.error = None
+        self.lock = threading.Lock()
+
+    def add(self, ring, seq, sample_rate, dac_steps, dwell_time_ms):
+        """Average frame seq of ring, call from the thread writing the ring"""
+
+        # The writer does not reuse the slot before this returns
+        words = ring.buffer[seq % ring.n_slots].view(np.int32)
+        try:
+            period = samples_per_period(sample_rate, dac_steps, dwell_time_ms)
+            check_whole_periods(len(words), period)
+        except ValueError as error:
+            self.frames_rejected += 1
+            self.error = str(error)
+            return
+        ch1, ch2 = self.unpacker.unpack(words)
+        with self.lock:
+            if self.channels is None or self.channels[0].samples_per_period != period:
+                self.channels = [
+                    CoherentAverager(period, self.mode, self.n_frames) for _ in range(2)
+                ]
+            self.channels[0].update(ch1)
+            self.channels[1].update(ch2)
+            self.error = None
+
+    def averages(self):
+        """Copies of the average period of both channels, None before the first frame"""
+
+        with self.lock:
+            if self.channels is None:
+                return None
+            return self.channels[0].average.copy(), self.channels[1].average.copy()
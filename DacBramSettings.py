@@ -13,8 +13,10 @@ from PyQt6.QtWidgets import (
 from PyQt6.QtGui import QIntValidator, QDoubleValidator
 from PyQt6.QtCore import pyqtSlot, pyqtSignal
 
-from source import initDacBram, stop_sweep
+from source import stop_sweep
 from AdcReceiver import pita, AdcReceiverThread
+from BoardConnection import board_lock
+from DacWaveformCache import dac_waveforms
 from SignalManager import DacSignalManager
 
 MHZ_MAX_DAC_FREQ = 125
@@ -40,12 +42,15 @@ class StartStopButton(QPushButton):
 class DacBramSettingsTab(QGroupBox):
     update_adc = pyqtSignal()
 
-    def __init__(self, adcreceiver: AdcReceiverThread, channel):
+    def __init__(self, adcreceiver: AdcReceiverThread, channel, scheduler=None):
         super().__init__()
 
         # adcReceiverObject:
         self.adcreceiver = adcreceiver
 
+        # Optional ReconfigScheduler, without one changes are applied at once
+        self.scheduler = scheduler
+
         # bram-dac channel
         self.channel = channel
 
@@ -271,45 +276,80 @@ class DacBramSettingsTab(QGroupBox):
     def sweep_button_clicked(self):
         self.start_sweep_button.toggle_button()
         if self.start_sweep_button.isChecked():
-            if self.adcreceiver.isRunning:
-                self.adcreceiver.stop()
-
             self.get_signal_info()
             self.get_frequency_info()
-            initDacBram(
-                pita,
-                self.signal_type,
-                self.amplitude,
-                self.start_V,
-                self.stop_V,
-                self.dac_steps,
-                self.dwell_time_ms,
-                self.channel,
-            )
+            if self.scheduler is not None:
+                # Uploaded off the GUI thread, the ADC restarts once it is done
+                self.scheduler.request_dac_upload(self)
+                return
+            if self.adcreceiver.isRunning():
+                self.adcreceiver.stop()
+            dac_waveforms.upload(pita, *self.dac_config())
         else:
             self.get_reset_voltage()
-            stop_sweep(pita, self.channel, self.reset_voltage)
+            if self.scheduler is not None:
+                self.scheduler.request_sweep_stop(self, self.reset_voltage)
+                return
+            self.stop_dac_sweep(self.reset_voltage)
         self.update_adc.emit()
 
+    def stop_dac_sweep(self, reset_voltage):
+        with board_lock(pita):
+            stop_sweep(pita, self.channel, reset_voltage)
+        dac_waveforms.invalidate(self.channel)
+
     @pyqtSlot()
     def update_dac_config(self):
         self.update_signal_options()
         self.update_frequency_options()
         self.get_frequency_info()
-        
-        if self.start_sweep_button.isChecked():
+
+        if self.scheduler is not None:
+            self.scheduler.request_dac_upload(self)
+        elif self.apply_dac_config():
+            self.update_adc.emit()
+
+    def apply_dac_config(self):
+        """
+        Upload the current waveform if the sweep is running.
+
+        :return: True if the ADC has to be restarted for the new settings.
+        """
+        restart_adc, config = self.prepare_dac_config()
+        if config is not None:
             if self.adcreceiver.isRunning():
                 self.adcreceiver.stop()
+            dac_waveforms.upload(pita, *config)
+        return restart_adc
 
-            self.get_signal_info()
-            initDacBram(
-                pita,
-                self.signal_type,
-                self.amplitude,
-                self.start_V,
-                self.stop_V,
-                self.dac_steps,
-                self.dwell_time_ms,
-                self.channel,
-            )
-        self.update_adc.emit()
+    def prepare_dac_config(self):
+        """
+        Read the waveform settings and check whether they have to be uploaded.
+
+        The caller stops the ADC before uploading, so that the GUI thread does
+        not have to wait for it with a scheduler.
+
+        :return: Whether the ADC has to be restarted, and the dac_config() to
+            upload or None if the port already has it.
+        """
+        if not self.start_sweep_button.isChecked():
+            return True, None
+
+        self.get_signal_info()
+        if dac_waveforms.is_loaded(*self.dac_config()):
+            # Same waveform as on the port, no upload and no ADC restart
+            return False, None
+        return True, self.dac_config()
+
+    def dac_config(self):
+        """Current waveform settings in initDacBram argument order, without the board"""
+
+        return (
+            self.signal_type,
+            self.amplitude,
+            self.start_V,
+            self.stop_V,
+            self.dac_steps,
+            self.dwell_time_ms,
+            self.channel,
+        )
@@ -0,0 +1,86 @@
+import threading
+
+from source import initDacBram
+
+from BoardConnection import board_lock
+
+
+def waveform_key(signal_type, amplitude, start_V, stop_V, dac_steps, dwell_time_ms, channel):
+    """
+    Hashable key of a DAC configuration.
+
+    Parameters the signal type does not use are left out, so editing the start
+    voltage of a sine does not count as a new waveform.
+    """
+    if signal_type == "Sine":
+        shape = (float(amplitude),)
+    else:
+        shape = (float(start_V), float(stop_V))
+    return (signal_type, shape, int(dac_steps), float(dwell_time_ms), channel)
+
+
+class DacWaveformCache:
+    """
+    Remember what is loaded on each DAC port and skip uploads that change nothing.
+
+    upload() only calls initDacBram when the configuration differs from the one
+    currently loaded on the channel. Call invalidate() when the board state is
+    changed behind the cache's back, e.g. by stop_sweep. Used from the GUI
+    thread and the AsyncBoard thread: uploads hold the board lock (see
+    board_lock) and the bookkeeping is guarded by lock.
+
+    Switching back to an earlier preset is not instant, it costs a full
+    initDacBram like any other change. Each port's BRAM holds a single table and
+    initDacBram computes the table on every call, so there is nothing a host
+    side cache of earlier tables could save. Only re-selecting the waveform
+    already on the port is skipped.
+
+    Only whole waveforms are uploaded. Writing just the samples that changed,
+    or a gain register for a pure amplitude change, is blocked on board support:
+    the rp client has no call to write part of the DAC BRAM or to set a DAC
+    gain, and initDacBram builds and sends the full table itself.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.loaded = {}
+        self.uploads = 0
+        self.skipped = 0
+
+    def is_loaded(self, signal_type, amplitude, start_V, stop_V, dac_steps, dwell_time_ms, channel):
+        key = waveform_key(signal_type, amplitude, start_V, stop_V, dac_steps, dwell_time_ms, channel)
+        with self.lock:
+            return self.loaded.get(channel) == key
+
+    def upload(self, board, signal_type, amplitude, start_V, stop_V, dac_steps, dwell_time_ms, channel):
+        """
+        Load the waveform on the channel unless it is already there.
+
+        :return: True if it was sent to the board.
+        """
+        key = waveform_key(signal_type, amplitude, start_V, stop_V, dac_steps, dwell_time_ms, channel)
+        with board_lock(board):
+            with self.lock:
+                if self.loaded.get(channel) == key:
+                    self.skipped += 1
+                    return False
+                # Forget the old state first, a failed upload leaves the port unknown
+                self.loaded.pop(channel, None)
+            initDacBram(board, signal_type, amplitude, start_V, stop_V, dac_steps, dwell_time_ms, channel)
+            with self.lock:
+                self.loaded[channel] = key
+                self.uploads += 1
+        return True
+
+    def invalidate(self, channel=None):
+        """Forget what is loaded on channel, or on all channels"""
+
+        with self.lock:
+            if channel is None:
+                self.loaded.clear()
+            else:
+                self.loaded.pop(channel, None)
+
+
+# Shared by both DAC tabs, the board only has one set of ports
+dac_waveforms = DacWaveformCache()
@@ -0,0 +1,96 @@
+import numpy as np
+
+
+def minmax_decimate(y, n_buckets, start=0):
+    """
+    Reduce y to the minimum and maximum sample of each of n_buckets buckets.
+
+    The two extremes of a bucket are kept in their original order, so a curve
+    drawn through the result has the same envelope as the full data and single
+    sample glitches stay visible.
+
+    :param y: 1D array of samples.
+    :param n_buckets: Number of buckets, usually the view width in pixels.
+    :param start: Index of y[0] in the full record, added to the returned indices.
+
+    :return: Sample indices and the samples at these indices.
+    """
+    n = len(y)
+    if n_buckets < 1 or n <= 2 * n_buckets:
+        return np.arange(start, start + n), y
+
+    bucket_size = n // n_buckets
+    usable = bucket_size * n_buckets
+    blocks = y[:usable].reshape(n_buckets, bucket_size)
+    i_min = blocks.argmin(axis=1)
+    i_max = blocks.argmax(axis=1)
+    offsets = np.arange(0, usable, bucket_size)
+
+    indices = np.empty(2 * n_buckets + (2 if usable < n else 0), dtype=np.intp)
+    indices[0:2 * n_buckets:2] = offsets + np.minimum(i_min, i_max)
+    indices[1:2 * n_buckets:2] = offsets + np.maximum(i_min, i_max)
+    if usable < n:
+        # Samples that do not fill a whole bucket form one last bucket
+        tail = y[usable:]
+        i_min, i_max = tail.argmin(), tail.argmax()
+        indices[-2] = usable + min(i_min, i_max)
+        indices[-1] = usable + max(i_min, i_max)
+
+    return indices + start, y[indices]
+
+
+def lttb_decimate(y, n_out, start=0):
+    """
+    Reduce y to n_out samples with the Largest-Triangle-Three-Buckets algorithm.
+
+    Gives a visually closer curve than min/max for smooth signals, but may drop
+    narrow peaks. The sample index is used as x, samples are assumed equidistant.
+
+    Classic LTTB anchors each triangle at the point picked in the previous
+    bucket, which forces a Python loop over the buckets (about 20 ms per
+    channel for 3200 points). Here the anchor is the mean of the previous
+    bucket instead, so all buckets are evaluated in one vectorised pass, at
+    about the cost of minmax_decimate. The picked points differ only where a
+    bucket is very uneven.
+
+    :param y: 1D array of samples.
+    :param n_out: Number of samples to keep.
+    :param start: Index of y[0] in the full record, added to the returned indices.
+
+    :return: Sample indices and the samples at these indices.
+    """
+    n = len(y)
+    if n_out < 3 or n <= n_out:
+        return np.arange(start, start + n), y
+
+    # First and last sample are always kept, the rest is split in n_out - 2 buckets
+    edges = np.linspace(1, n - 1, n_out - 1).astype(np.intp)
+    lo, hi = edges[:-1], edges[1:]
+    counts = hi - lo
+    width = int(counts.max())
+
+    # (buckets x width) view of the buckets, padded where a bucket is shorter
+    candidates = lo[:, None] + np.arange(width)
+    valid = candidates < hi[:, None]
+    candidates = np.minimum(candidates, n - 1)
+    y_b = y[candidates].astype(np.float64)
+    mean_x = (lo + hi - 1) / 2
+    mean_y = np.where(valid, y_b, 0).sum(axis=1) / counts
+
+    # Anchors: mean of the previous and of the next bucket, the end points outside
+    prev_x = np.concatenate(([0.0], mean_x[:-1]))
+    prev_y = np.concatenate(([y[0]], mean_y[:-1]))
+    next_x = np.concatenate((mean_x[1:], [n - 1.0]))
+    next_y = np.concatenate((mean_y[1:], [y[n - 1]]))
+
+    area = np.abs(
+        (prev_x - next_x)[:, None] * (y_b - prev_y[:, None])
+        - (prev_x[:, None] - candidates) * (next_y - prev_y)[:, None]
+    )
+    area[~valid] = -1
+
+    indices = np.empty(n_out, dtype=np.intp)
+    indices[0], indices[-1] = 0, n - 1
+    indices[1:-1] = candidates[np.arange(len(lo)), area.argmax(axis=1)]
+
+    return indices + start, y[indices]
@@ -0,0 +1,151 @@
+"""
+Frame analysis in worker processes.
+
+The workers attach to the shared memory of a FrameRingBuffer(shared=True) and
+read frames in place, only a small handle is pickled per frame. They send back
+per-channel statistics and a min/max decimated trace, a few thousand points
+instead of the whole frame. This module must not import Qt, it is imported by
+every worker process.
+"""
+import multiprocessing
+import os
+from concurrent.futures import ProcessPoolExecutor
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from AdcUnpacker import AdcUnpacker, ADC_FULL_SCALE_V
+from Decimation import minmax_decimate
+
+DEFAULT_POINTS = 2000
+
+# Per worker process: shared memory blocks attached so far, by name
+attached = {}
+unpacker = AdcUnpacker(np.float32)
+
+
+def attached_frames(name, n_slots, frame_bytes):
+    frames = attached.get(name)
+    if frames is None:
+        # Spawned workers share the resource tracker of the GUI process, so
+        # attaching does not make the block go away when a worker exits
+        shm = shared_memory.SharedMemory(name=name)
+        # The ring was resized, the old block is not used anymore
+        for old_name in list(attached):
+            old_shm, _ = attached.pop(old_name)
+            try:
+                old_shm.close()
+            except BufferError:
+                pass
+        frames = (shm, np.ndarray((n_slots, frame_bytes), dtype=np.uint8, buffer=shm.buf))
+        attached[name] = frames
+    return frames[1]
+
+
+def channel_summary(y, sample_rate, n_points):
+    indices, values = minmax_decimate(y, max(1, n_points // 2))
+    spectrum = np.abs(np.fft.rfft(y - y.mean()))
+    return {
+        "indices": indices,
+        "values": values,
+        "mean": float(y.mean()),
+        "rms": float(np.sqrt(np.mean(np.square(y, dtype=np.float64)))),
+        "min": float(y.min()),
+        "max": float(y.max()),
+        # sample_rate in MHz, as everywhere in the GUI
+        "peak_frequency_hz": float(np.argmax(spectrum) * sample_rate * 1e6 / len(y)),
+    }
+
+
+def summary_text(result):
+    """One line for the status bar with the statistics of both channels of an analyse_frame result"""
+
+    parts = []
+    for channel in ("ch1", "ch2"):
+        summary = result[channel]
+        parts.append(
+            f"{channel.upper()} mean {summary['mean']:.3f} V  rms {summary['rms']:.3f} V  "
+            f"min/max {summary['min']:.3f}/{summary['max']:.3f} V  "
+            f"peak {summary['peak_frequency_hz'] / 1e3:.3f} kHz"
+        )
+    return "   ".join(parts)
+
+
+def analyse_frame(handle, sample_rate, n_points=DEFAULT_POINTS, full_scale_v=ADC_FULL_SCALE_V):
+    """
+    Summarise one frame of the shared ring, runs in a worker process.
+
+    :param handle: FrameRingBuffer.frame_handle() of the frame.
+    :param sample_rate: ADC sample rate in MHz.
+    :param n_points: Size of the decimated traces.
+    :param full_scale_v: Full scale voltage of the ADC input range.
+
+    :return: Dict with the number of samples, the sample rate and a channel_summary per channel,
+        or None if the ring was reallocated in the meantime.
+    """
+    name, n_slots, frame_bytes, slot = handle
+    try:
+        frames = attached_frames(name, n_slots, frame_bytes)
+    except FileNotFoundError:
+        return None
+    if unpacker.full_scale_v != full_scale_v:
+        unpacker.set_full_scale(full_scale_v)
+    ch1, ch2 = unpacker.unpack(frames[slot].view(np.int32))
+    return {
+        "samples": len(ch1),
+        "sample_rate": sample_rate,
+        "ch1": channel_summary(ch1, sample_rate, n_points),
+        "ch2": channel_summary(ch2, sample_rate, n_points),
+    }
+
+
+class DspWorkerPool:
+    """
+    Process pool analysing frames of a shared FrameRingBuffer.
+
+    submit() returns a Future of analyse_frame. Results are only trustworthy if
+    the frame was not overwritten while a worker read it, result() checks that.
+    Workers are started with spawn, forking the GUI process with its threads is
+    not safe.
+    """
+
+    def __init__(self, n_workers=None):
+        self.n_workers = n_workers or os.cpu_count() or 1
+        self.executor = ProcessPoolExecutor(
+            self.n_workers, mp_context=multiprocessing.get_context("spawn")
+        )
+        self.in_flight = 0
+        self.submitted = 0
+        self.completed = 0
+        self.discarded = 0
+
+    @property
+    def is_busy(self):
+        return self.in_flight >= self.n_workers
+
+    def submit(self, ring, seq, sample_rate, n_points=DEFAULT_POINTS, full_scale_v=ADC_FULL_SCALE_V):
+        """Analyse frame seq of ring, returns a Future or None if the frame is gone"""
+
+        handle = ring.frame_handle(seq)
+        if handle is None:
+            return None
+        self.in_flight += 1
+        self.submitted += 1
+        return self.executor.submit(analyse_frame, handle, sample_rate, n_points, full_scale_v)
+
+    def result(self, ring, seq, future):
+        """Result of a finished submit(), None if it failed or the frame was overwritten"""
+
+        self.in_flight -= 1
+        if future.cancelled() or future.exception() is not None:
+            self.discarded += 1
+            return None
+        result = future.result()
+        if result is None or not ring.is_valid(seq):
+            self.discarded += 1
+            return None
+        self.completed += 1
+        return result
+
+    def close(self):
+        self.executor.shutdown(wait=False, cancel_futures=True)
@@ -0,0 +1,155 @@
+import time
+from multiprocessing import shared_memory
+
+import numpy as np
+
+DEFAULT_RING_SLOTS = 8
+
+
+class FrameRingBuffer:
+    """
+    Preallocated ring of raw ADC frames shared between the receiver and the GUI.
+
+    There is exactly one writer (the receiver thread) and one reader (the GUI).
+    Frames are addressed by a monotonically increasing sequence number, slot
+    ``seq % n_slots`` holds frame ``seq``. The writer never waits for the reader:
+    when the reader falls behind, the oldest slot is overwritten and counted as
+    dropped. Only plain integer attributes are shared, so no lock is needed.
+
+    With shared=True the slots live in a multiprocessing.shared_memory block, so
+    other processes can read frames through frame_handle() without copying
+    (see DspWorkers). Call close() to release the block.
+    """
+
+    def __init__(self, frame_bytes=0, n_slots=DEFAULT_RING_SLOTS, shared=False):
+        self.n_slots = n_slots
+        self.shared = shared
+        self.shm = None
+        self.frame_bytes = None
+        self.write_seq = 0  # sequence number of the frame currently being written
+        self.read_seq = 0  # every frame below this number was seen by the reader
+        self.valid_from = 0  # frames below this number belong to an old frame size
+        self.frames_written = 0
+        self.frames_dropped = 0
+        self.resize(frame_bytes)
+
+    def resize(self, frame_bytes):
+        """Reallocate the slots for a new frame size, keep them if it is unchanged."""
+
+        frame_bytes = int(frame_bytes)
+        if frame_bytes == self.frame_bytes:
+            return
+        self.frame_bytes = frame_bytes
+        if self.shared:
+            old_shm = self.shm
+            self.shm = shared_memory.SharedMemory(create=True, size=max(1, self.n_slots * frame_bytes))
+            self.buffer = np.ndarray((self.n_slots, frame_bytes), dtype=np.uint8, buffer=self.shm.buf)
+            self.buffer.fill(0)
+            self.release_shared_memory(old_shm)
+        else:
+            self.buffer = np.zeros((self.n_slots, frame_bytes), dtype=np.uint8)
+        self.timestamps = np.zeros(self.n_slots)
+        # ADC sample rate in MHz of every frame, settings may change between frames
+        self.sample_rates = np.zeros(self.n_slots)
+        self.valid_from = self.write_seq
+        self.read_seq = self.write_seq
+
+    def writable_slot(self):
+        """Return the byte view of the slot the next frame has to be written to."""
+
+        return self.buffer[self.write_seq % self.n_slots]
+
+    def commit(self, sample_rate=None):
+        """
+        Publish the frame in the writable slot and return its sequence number.
+
+        :param sample_rate: ADC sample rate in MHz the frame was sampled with,
+            stored in sample_rates.
+        """
+
+        seq = self.write_seq
+        overwritten = seq - self.n_slots
+        if overwritten >= self.valid_from and overwritten >= self.read_seq:
+            # The reader never saw the frame that was in this slot
+            self.frames_dropped += 1
+        self.timestamps[seq % self.n_slots] = time.monotonic()
+        self.sample_rates[seq % self.n_slots] = sample_rate or 0
+        self.frames_written += 1
+        self.write_seq = seq + 1
+        return seq
+
+    def is_valid(self, seq):
+        """True while frame `seq` is published and has not been overwritten yet."""
+
+        return max(self.valid_from, self.write_seq - self.n_slots + 1) <= seq < self.write_seq
+
+    def read(self, seq):
+        """
+        Return frame `seq` as int32 words without copying, or None if it is gone.
+
+        The writer does not wait for the reader, so the slot can be overwritten
+        while the view is in use. Check is_valid(seq) again once done with the
+        view and throw away what was computed from it if the frame is gone, or
+        use copy() instead.
+
+        Frames older than `seq` count as seen, so they are not reported as dropped.
+        """
+
+        if not self.is_valid(seq):
+            return None
+        self.read_seq = max(self.read_seq, seq + 1)
+        return self.buffer[seq % self.n_slots].view(np.int32)
+
+    def copy(self, seq, out=None):
+        """
+        Copy frame `seq` as int32 words into out (allocated if None).
+
+        :return: out, or None if the frame was gone before or overwritten
+            during the copy.
+        """
+        frame = self.read(seq)
+        if frame is None:
+            return None
+        if out is None:
+            out = np.empty_like(frame)
+        out[:] = frame
+        return out if self.is_valid(seq) else None
+
+    def latest_seq(self):
+        """Sequence number of the newest published frame, or None."""
+
+        seq = self.write_seq - 1
+        return seq if self.is_valid(seq) else None
+
+    def backlog(self):
+        """Number of published frames the reader has not looked at yet."""
+
+        return min(self.n_slots, self.write_seq - max(self.read_seq, self.valid_from))
+
+    def frame_handle(self, seq):
+        """
+        Picklable reference to frame `seq` for another process, or None.
+
+        :return: (shared memory name, n_slots, frame_bytes, slot). The frame is
+            intact as long as is_valid(seq) still holds after it was read.
+        """
+        if self.shm is None or not self.is_valid(seq):
+            return None
+        return self.shm.name, self.n_slots, self.frame_bytes, seq % self.n_slots
+
+    def release_shared_memory(self, shm):
+        if shm is None:
+            return
+        shm.unlink()
+        try:
+            shm.close()
+        except BufferError:
+            # A view of the old slots is still alive, the mapping goes with it
+            pass
+
+    def close(self):
+        """Release the shared memory block, the ring cannot be used afterwards"""
+
+        shm, self.shm = self.shm, None
+        self.buffer = None
+        self.release_shared_memory(shm)
@@ -2,8 +2,8 @@ import sys
 import time
 import numpy as np
 import pyqtgraph as pg
-from PyQt6.QtCore import pyqtSlot
-from PyQt6.QtGui import QDoubleValidator
+from PyQt6.QtCore import pyqtSignal, pyqtSlot, QTimer
+from PyQt6.QtGui import QAction, QDoubleValidator, QIntValidator
 from PyQt6.QtWidgets import (
     QVBoxLayout,
     QCheckBox,
@@ -17,18 +17,57 @@ from PyQt6.QtWidgets import (
     QWidget,
     QTabWidget,
     QLineEdit,
+    QPushButton,
+    QFileDialog,
+    QInputDialog,
 )
-from rp.adc.helpers import unpackADCData
 from rp.ram.config import RAM_SIZE
-from AdcReceiver import AdcReceiverThread, pita
+from AdcReceiver import (
+    AdcReceiverThread,
+    pita,
+    PACING_ADAPTIVE,
+    PACING_FIXED,
+    PACING_NONE,
+)
 from rp.constants import RP_DAC_PORT_1, RP_DAC_PORT_2, ALL_BRAM_DAC_PORTS
 from DacBramSettings import StartStopButton, DacBramSettingsTab
+from DacWaveformCache import dac_waveforms
+from ReconfigScheduler import ReconfigScheduler
+from AsyncBoard import AsyncBoardBridge, AsyncBoardClient
+from BoardConnection import board_lock
 from source import stop_sweep
 from SignalManager import AdcSignalManager
-
+from Decimation import minmax_decimate, lttb_decimate
+from AdcUnpacker import AdcUnpacker, ADC_INPUT_RANGES
+from TimeAxis import time_axis
+from CaptureRecorder import CaptureRecorder, new_capture_path
+from CoherentAverager import (
+    PeriodAverager,
+    AVERAGING_WINDOW,
+    AVERAGING_EXPONENTIAL,
+    check_whole_periods,
+    samples_per_period,
+)
+from FrameBuffer import FrameRingBuffer
+from DspWorkers import DspWorkerPool, summary_text
+from Profiler import profiler
+
+DISPLAY_FPS_OPTIONS = [30, 60, 15, 10]
+DECIMATION_MODES = ["Min/Max", "LTTB", "Off"]
+AVERAGING_MODES = [AVERAGING_WINDOW, AVERAGING_EXPONENTIAL]
+# (label, pacing policy, frame interval in s) of the acquisition loop
+PACING_OPTIONS = [
+    ("Adaptive", PACING_ADAPTIVE, 0.1),
+    ("Free running", PACING_NONE, 0.1),
+    ("10 Hz", PACING_FIXED, 0.1),
+    ("1 Hz", PACING_FIXED, 1.0),
+]
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # (seq, future) of a frame analysed by the DSP worker pool
+    dspResultReady = pyqtSignal(int, object)
+
+    def __init__(self, adcreceiver=None, dsp_workers=0):
         super().__init__()
         self.setWindowTitle("Data Acquisition in Block Mode")
         self.central_widget = QWidget()
@@ -43,14 +82,56 @@ class MainWindow(QMainWindow):
         self.ram_size = None
         self.max_periods = None
 
-        self.adcreceiver = AdcReceiverThread()  # Initialize adcreceiver
-        self.adcreceiver.dataReceived.connect(self.update_plot)
+        # Initialize adcreceiver, a different frame source may be passed in
+        self.adcreceiver = AdcReceiverThread() if adcreceiver is None else adcreceiver
+        self.adcreceiver.frameReady.connect(self.frame_ready)
+        # The receive loop the thread runs, it owns the ring and the frame consumers
+        self.acquisition = self.adcreceiver.acquisition
+        # Frames are unpacked into the spare buffers, the shown ones are only
+        # replaced once the frame turned out not to be overwritten meanwhile
+        self.unpacker = AdcUnpacker(np.float32)
+        self.spare_unpacker = AdcUnpacker(np.float32)
+
+        # With dsp_workers > 0 frames are analysed in worker processes and only
+        # decimated traces come back to the GUI thread
+        self.dsp_pool = None
+        if dsp_workers:
+            self.acquisition.ring = FrameRingBuffer(shared=True)
+            self.dsp_pool = DspWorkerPool(dsp_workers)
+            self.dspResultReady.connect(self.show_dsp_result)
+
+        # Display scheduler: received frames are only rendered on the display timer
+        self.latest_frame_seq = None
+        self.frames_acquired = 0
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+        self.display_timer = QTimer(self)
+        self.display_timer.timeout.connect(self.render_latest_frame)
+        self.display_stats_timer = QTimer(self)
+        self.display_stats_timer.timeout.connect(self.update_display_stats)
+
+        # Bursts of DAC and ADC setting changes are applied once
+        self.reconfig_scheduler = ReconfigScheduler(parent=self)
+        self.reconfig_scheduler.set_adc_restart(self.apply_adc_config)
+
+        # DAC uploads run on an asyncio loop so the window stays responsive
+        self.board_bridge = AsyncBoardBridge(self)
+        self.board_client = AsyncBoardClient()
+        self.reconfig_scheduler.set_async_board(self.board_bridge, self.board_client)
 
         # Create Adc and Dac settings tab with pyqtgraph
         self.create_adc_settings_group()
         self.create_dac_bram_group()
         self.create_plot_widget()
+        self.create_status_bar()
+        self.create_menu()
         self.set_max_periods()
+        self.set_display_fps()
+        self.set_acquisition_pacing()
+        if self.dsp_pool is not None:
+            # update_plot averages, the DSP workers only see single frames
+            self.averaging_checkbox.setEnabled(False)
+            self.averaging_checkbox.setToolTip("Not available with DSP workers")
 
         # Initialise AdcSignalManager to connect signals and slots
         self.AdcSignalManager = AdcSignalManager()
@@ -122,6 +203,65 @@ class MainWindow(QMainWindow):
         )
         self.adc_settings_layout.addWidget(self.ram_size_box)
 
+        # Select the input range set by the jumpers, it scales the ADC codes
+        self.input_range_box, self.input_range_combobox = self.create_combobox_group(
+            "Input Range", list(ADC_INPUT_RANGES)
+        )
+        self.adc_settings_layout.addWidget(self.input_range_box)
+
+        # Select the refresh rate of the plot
+        self.display_fps_box, self.display_fps_combobox = self.create_combobox_group(
+            "Display FPS", [f"{fps}" for fps in DISPLAY_FPS_OPTIONS]
+        )
+        self.adc_settings_layout.addWidget(self.display_fps_box)
+
+        # Select how a frame is reduced to the width of the plot
+        self.decimation_box, self.decimation_combobox = self.create_combobox_group(
+            "Decimation", DECIMATION_MODES
+        )
+        self.adc_settings_layout.addWidget(self.decimation_box)
+
+        # Select how fast new RAM blocks are requested
+        self.pacing_box, self.pacing_combobox = self.create_combobox_group(
+            "Acquisition Pacing", [label for label, _, _ in PACING_OPTIONS]
+        )
+        self.adc_settings_layout.addWidget(self.pacing_box)
+
+        # Checkbox to record the raw frames to disk
+        self.recording_box = QGroupBox("Recording")
+        self.recording_layout = QVBoxLayout(self.recording_box)
+        self.record_checkbox = QCheckBox("Record to disk")
+        self.capture_dir_button = QPushButton("Folder...")
+        self.capture_dir = None
+        self.recording_file_label = QLabel("")
+        self.recording_layout.addWidget(self.record_checkbox)
+        self.recording_layout.addWidget(self.capture_dir_button)
+        self.recording_layout.addWidget(self.recording_file_label)
+        self.adc_settings_layout.addWidget(self.recording_box)
+
+        # Coherent averaging of the DAC periods in Sync mode
+        self.averaging_box = QGroupBox("Period Averaging")
+        self.averaging_layout = QVBoxLayout(self.averaging_box)
+        self.averaging_checkbox = QCheckBox("Average periods (Sync)")
+        self.averaging_mode_combobox = QComboBox()
+        self.averaging_mode_combobox.addItems(["N frames", "Exponential"])
+        self.averaging_frames_edit = QLineEdit()
+        self.averaging_frames_edit.setText(str(16))
+        self.averaging_frames_edit.setValidator(QIntValidator(1, 10000))
+        self.averaging_layout.addWidget(self.averaging_checkbox)
+        self.averaging_layout.addWidget(self.averaging_mode_combobox)
+        self.averaging_layout.addWidget(self.averaging_frames_edit)
+        self.adc_settings_layout.addWidget(self.averaging_box)
+
+        # Per-stage latency of the acquisition pipeline, shown in the status bar
+        self.latency_box = QGroupBox("Latency Statistics")
+        self.latency_layout = QVBoxLayout(self.latency_box)
+        self.latency_checkbox = QCheckBox("Measure latency")
+        self.latency_export_button = QPushButton("Export...")
+        self.latency_layout.addWidget(self.latency_checkbox)
+        self.latency_layout.addWidget(self.latency_export_button)
+        self.adc_settings_layout.addWidget(self.latency_box)
+
         # Groupbox to Set the number of periods and to show total periods
         self.periods_box = QGroupBox("Periods Settings")
         self.periods_box.setFixedWidth(400)
@@ -157,8 +297,8 @@ class MainWindow(QMainWindow):
         self.tab_widget = QTabWidget()
         self.group_layout.addWidget(self.tab_widget)
 
-        self.tab1 = DacBramSettingsTab(self.adcreceiver, channel=0)
-        self.tab2 = DacBramSettingsTab(self.adcreceiver, channel=1)
+        self.tab1 = DacBramSettingsTab(self.adcreceiver, channel=0, scheduler=self.reconfig_scheduler)
+        self.tab2 = DacBramSettingsTab(self.adcreceiver, channel=1, scheduler=self.reconfig_scheduler)
 
         self.tab_widget.addTab(self.tab1, "PORT0")
         self.tab_widget.addTab(self.tab2, "PORT1")
@@ -184,6 +324,41 @@ class MainWindow(QMainWindow):
 
         self.main_layout.addWidget(self.plot_widget, stretch=1)
 
+        # Zooming or panning decimates the visible part of the frame again
+        self.plot_widget.getViewBox().sigXRangeChanged.connect(self.draw_curves)
+        self.drawing_curves = False
+
+    def create_status_bar(self):
+        """Create status bar showing the display statistics"""
+
+        self.display_stats_label = QLabel()
+        self.statusBar().addPermanentWidget(self.display_stats_label)
+        self.latency_stats_label = QLabel()
+        self.latency_stats_label.setVisible(False)
+        self.statusBar().addWidget(self.latency_stats_label)
+        # Channel statistics of the DSP workers
+        self.dsp_summary_label = QLabel()
+        self.dsp_summary_label.setVisible(self.dsp_pool is not None)
+        self.statusBar().addWidget(self.dsp_summary_label)
+        self.update_display_stats()
+        self.display_stats_timer.start(1000)
+
+    def create_menu(self):
+        """Create the Diagnostics menu"""
+
+        diagnostics_menu = self.menuBar().addMenu("Diagnostics")
+        self.profile_action = QAction("Profile for N seconds...", self)
+        diagnostics_menu.addAction(self.profile_action)
+
+    @pyqtSlot()
+    def start_profiling(self):
+        """Profile the receiver and GUI threads, see Profiler"""
+
+        duration_s, ok = QInputDialog.getInt(self, "Profile", "Seconds:", 10, 1, 3600)
+        if ok:
+            output_dir = profiler.start(duration_s)
+            self.statusBar().showMessage(f"Profiling for {duration_s} s into {output_dir}", 5000)
+
     def create_combobox_group(self, title, items):
         group_box = QGroupBox(title)
         layout = QVBoxLayout(group_box)
@@ -217,12 +392,27 @@ class MainWindow(QMainWindow):
                 self.adc_sync_dac_dwell_time_ms,
                 self.ram_size,
                 )
+            self.reset_display_stats()
             self.adcreceiver.start()
         else:
             self.adcreceiver.stop()
 
     @pyqtSlot()
     def update_adc_config(self):
+        self.reconfig_scheduler.request_adc_restart()
+
+    @pyqtSlot(str, list)
+    def show_dac_upload_error(self, error, tabs):
+        """Report a failed DAC upload and show the sweeps of its ports as stopped"""
+
+        self.statusBar().showMessage(f"DAC upload failed: {error}", 10000)
+        for tab in tabs:
+            if tab.start_sweep_button.isChecked():
+                tab.start_sweep_button.setChecked(False)
+                tab.start_sweep_button.toggle_button()
+
+    def apply_adc_config(self):
+        self.reset_averaging()
         if self.start_plot_button.isChecked():
             self.restart_adc_receiver()
 
@@ -252,44 +442,322 @@ class MainWindow(QMainWindow):
         self.max_periods = (ram * 1024 / 4) / ((self.adc_sync_dac_steps * self.adc_sync_dac_dwell_time_ms * 1e3) * self.adc_sample_rate)
         self.show_max_periods_label.setText(str(self.max_periods))
 
-    @pyqtSlot(bytes)
-    def update_plot(self, data_raw):
-        data = unpackADCData(np.frombuffer(data_raw, dtype=np.int32), 1, rawData=False)
-        self.y_data_ch1, self.y_data_ch2 = data[0], data[1]
-
-        total_samples = len(self.y_data_ch1)
-        total_time = total_samples / (self.adc_sample_rate * 1e6)
-        self.x_data = np.linspace(0, total_time, total_samples)
-
-        if self.channel_button_group.buttons()[0].isChecked():  # Channel 1
-            self.plot_graph_ch1.setData(self.x_data, self.y_data_ch1)
-            self.plot_graph_ch2.clear()
-        elif self.channel_button_group.buttons()[1].isChecked():  # Channel 2
-            self.plot_graph_ch2.setData(self.x_data, self.y_data_ch2)
-            self.plot_graph_ch1.clear()
+    @pyqtSlot()
+    def set_display_fps(self):
+        """(Re)start the display timer with the selected frame rate"""
+
+        fps = DISPLAY_FPS_OPTIONS[self.display_fps_combobox.currentIndex()]
+        self.display_timer.start(int(1000 / fps))
+
+    @pyqtSlot()
+    def set_input_range(self):
+        """Scale the following frames to the selected input range"""
+
+        full_scale_v = ADC_INPUT_RANGES[self.input_range_combobox.currentText()]
+        self.unpacker.set_full_scale(full_scale_v)
+        self.spare_unpacker.set_full_scale(full_scale_v)
+        self.reset_averaging()
+
+    @pyqtSlot()
+    def set_acquisition_pacing(self):
+        _, pacing, frame_interval_s = PACING_OPTIONS[self.pacing_combobox.currentIndex()]
+        self.acquisition.set_acquisition_options(
+            pipelined=True, pacing=pacing, frame_interval_s=frame_interval_s
+        )
+
+    @pyqtSlot()
+    def toggle_recording(self):
+        """Start or stop writing the received frames to a new capture file"""
+
+        if self.record_checkbox.isChecked():
+            try:
+                path = new_capture_path(self.capture_dir)
+                self.acquisition.recorder = CaptureRecorder(path)
+            except OSError as error:
+                # e.g. not enough space for the preallocated capture
+                self.record_checkbox.setChecked(False)
+                self.recording_file_label.setText("")
+                self.statusBar().showMessage(f"Recording not started: {error}", 10000)
+                return
+            self.recording_file_label.setText(path)
+        elif self.acquisition.recorder is not None:
+            recorder, self.acquisition.recorder = self.acquisition.recorder, None
+            recorder.close()
+
+    @pyqtSlot()
+    def choose_capture_dir(self):
+        """Directory of the following captures"""
+
+        directory = QFileDialog.getExistingDirectory(self, "Capture folder", self.capture_dir or "")
+        if directory:
+            self.capture_dir = directory
+
+    @pyqtSlot()
+    def toggle_latency_stats(self):
+        """Start measuring the pipeline stages from scratch, or stop measuring"""
+
+        stats = self.acquisition.stats
+        if self.latency_checkbox.isChecked():
+            stats.reset()
+        stats.enabled = self.latency_checkbox.isChecked()
+        self.latency_stats_label.setVisible(stats.enabled)
+
+    @pyqtSlot()
+    def export_latency_stats(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Export latency statistics", "latency.json", "JSON (*.json);;CSV (*.csv)"
+        )
+        if path:
+            self.acquisition.stats.export(path)
+
+    def reset_display_stats(self):
+        self.latest_frame_seq = None
+        self.frames_acquired = 0
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+
+    @pyqtSlot()
+    def update_display_stats(self):
+        self.display_stats_label.setText(
+            f"Frames acquired: {self.frames_acquired}   "
+            f"rendered: {self.frames_rendered}   "
+            f"skipped: {self.frames_skipped}   "
+            f"dropped: {self.acquisition.ring.frames_dropped}   "
+            f"acquisition: {self.acquisition.measured_fps:.1f} fps   "
+            f"reconfigurations avoided: {self.reconfig_scheduler.avoided}"
+        )
+        if self.dsp_pool is not None:
+            self.display_stats_label.setText(
+                self.display_stats_label.text()
+                + f"   DSP: {self.dsp_pool.completed} done, {self.dsp_pool.discarded} discarded"
+            )
+        if self.acquisition.stats.enabled:
+            self.latency_stats_label.setText(self.acquisition.stats.status_text())
+        recorder = self.acquisition.recorder
+        if recorder is not None:
+            self.display_stats_label.setText(
+                self.display_stats_label.text()
+                + f"   recorded: {recorder.frames_written} (lost {recorder.frames_lost})"
+            )
+
+    @pyqtSlot(int)
+    def frame_ready(self, seq):
+        """Remember the newest frame, a frame not rendered until now is skipped"""
+
+        if self.latest_frame_seq is not None:
+            self.frames_skipped += 1
+        self.latest_frame_seq = seq
+        self.frames_acquired += 1
+        stats = self.acquisition.stats
+        if stats.enabled:
+            ring = self.acquisition.ring
+            stats.record("hop", time.monotonic() - ring.timestamps[seq % ring.n_slots])
+
+    @pyqtSlot()
+    def render_latest_frame(self):
+        profiler.check("gui")
+        if self.latest_frame_seq is None:
+            return
+        if self.dsp_pool is not None:
+            self.submit_dsp_frame()
+            return
+        seq, self.latest_frame_seq = self.latest_frame_seq, None
+        if self.update_plot(seq):
+            self.frames_rendered += 1
+
+    def submit_dsp_frame(self):
+        """Hand the latest frame to a free DSP worker"""
+
+        if self.dsp_pool.is_busy:
+            # Try again on the next tick, with whatever frame is newest then
+            return
+        seq, self.latest_frame_seq = self.latest_frame_seq, None
+        width_px = max(1, int(self.plot_widget.getViewBox().width()))
+        ring = self.acquisition.ring
+        future = self.dsp_pool.submit(
+            ring,
+            seq,
+            ring.sample_rates[seq % ring.n_slots],
+            2 * width_px,
+            self.unpacker.full_scale_v,
+        )
+        if future is not None:
+            # Called in a pool thread, the signal brings the result to the GUI thread
+            future.add_done_callback(lambda done: self.dspResultReady.emit(seq, done))
+
+    @pyqtSlot(int, object)
+    def show_dsp_result(self, seq, future):
+        result = self.dsp_pool.result(self.acquisition.ring, seq, future)
+        if result is None:
+            return
+        x_data = time_axis(result["samples"], result["sample_rate"])
+        show_ch1 = not self.channel_button_group.buttons()[1].isChecked()
+        show_ch2 = not self.channel_button_group.buttons()[0].isChecked()
+        for curve, summary, shown in (
+            (self.plot_graph_ch1, result["ch1"], show_ch1),
+            (self.plot_graph_ch2, result["ch2"], show_ch2),
+        ):
+            if shown:
+                curve.setData(x_data[summary["indices"]], summary["values"])
+            else:
+                curve.clear()
+        self.dsp_summary_label.setText(summary_text(result))
+        self.frames_rendered += 1
+
+    def update_plot(self, seq):
+        """Draw frame seq, returns False if it was overwritten before it could be drawn"""
+
+        ring = self.acquisition.ring
+        frame = ring.read(seq)
+        if frame is None:  # overwritten by the receiver before we got to it
+            return False
+        stats = self.acquisition.stats if self.acquisition.stats.enabled else None
+        if stats is not None:
+            unpack_start = time.monotonic()
+            committed = ring.timestamps[seq % ring.n_slots]
+        sample_rate = ring.sample_rates[seq % ring.n_slots]
+        ch1, ch2 = self.spare_unpacker.unpack(frame)
+        if not ring.is_valid(seq):
+            # The receiver reused the slot while it was unpacked
+            return False
+        self.unpacker, self.spare_unpacker = self.spare_unpacker, self.unpacker
+        self.y_data_ch1, self.y_data_ch2 = ch1, ch2
+        if stats is not None:
+            plot_start = time.monotonic()
+            stats.record("unpack", plot_start - unpack_start)
+        if self.averaging_checkbox.isChecked() and self.acquisition.mode == "Sync":
+            self.average_periods()
+
+        # The rate the frame was sampled with, the settings may have changed since
+        self.x_data = time_axis(len(self.y_data_ch1), sample_rate)
+
+        self.draw_curves()
+        if stats is not None:
+            now = time.monotonic()
+            stats.record("plot", now - plot_start)
+            stats.record("end_to_end", now - committed)
+        return True
+
+    def average_periods(self):
+        """Replace the frame by the coherent average over the DAC periods of all acquired frames"""
+
+        averager = self.acquisition.averager
+        if averager is None:
+            return
+        if averager.error:
+            self.statusBar().showMessage(f"Averaging: {averager.error}", 2000)
+        averages = averager.averages()
+        if averages is not None:
+            self.y_data_ch1, self.y_data_ch2 = averages
+
+    @pyqtSlot()
+    def reset_averaging(self):
+        """Start averaging again with the current settings, in the acquisition loop"""
+
+        self.acquisition.averager = None
+        if not self.averaging_checkbox.isChecked():
+            return
+        self.get_adc_config()
+        if self.mode == "Sync":
+            try:
+                period = samples_per_period(
+                    self.adc_sample_rate,
+                    self.adc_sync_dac_steps,
+                    self.adc_sync_dac_dwell_time_ms,
+                )
+                check_whole_periods(int(self.ram_size_combobox.currentText()) * 1024 // 4, period)
+            except ValueError as error:
+                self.averaging_checkbox.setChecked(False)
+                self.statusBar().showMessage(f"Averaging not started: {error}", 10000)
+                return
+        self.acquisition.averager = PeriodAverager(
+            AVERAGING_MODES[self.averaging_mode_combobox.currentIndex()],
+            int(self.averaging_frames_edit.text() or 1),
+            self.unpacker.full_scale_v,
+        )
+
+    @pyqtSlot()
+    def draw_curves(self):
+        """Plot the selected channels of the current frame, decimated to the view"""
+
+        if self.dsp_pool is not None:
+            # The curves hold the traces of show_dsp_result, the workers decimate
+            # the whole frame, so zooming does not decimate again
+            return
+        # setData may change the auto range, which must not trigger another redraw
+        if self.drawing_curves:
+            return
+        self.drawing_curves = True
+        try:
+            if self.channel_button_group.buttons()[0].isChecked():  # Channel 1
+                self.plot_decimated(self.plot_graph_ch1, self.y_data_ch1)
+                self.plot_graph_ch2.clear()
+            elif self.channel_button_group.buttons()[1].isChecked():  # Channel 2
+                self.plot_decimated(self.plot_graph_ch2, self.y_data_ch2)
+                self.plot_graph_ch1.clear()
+            else:
+                self.plot_decimated(self.plot_graph_ch1, self.y_data_ch1)
+                self.plot_decimated(self.plot_graph_ch2, self.y_data_ch2)
+        finally:
+            self.drawing_curves = False
+
+    def visible_index_range(self):
+        """Index range of self.x_data inside the visible x range of the plot"""
+
+        total_samples = len(self.x_data)
+        view_box = self.plot_widget.getViewBox()
+        if view_box.autoRangeEnabled()[0]:
+            return 0, total_samples
+        x_min, x_max = view_box.viewRange()[0]
+        start = max(0, int(np.searchsorted(self.x_data, x_min)) - 1)
+        stop = min(total_samples, int(np.searchsorted(self.x_data, x_max)) + 1)
+        return start, stop
+
+    def plot_decimated(self, curve, y_data):
+        """Set curve data to at most a few points per pixel of the visible range"""
+
+        start, stop = self.visible_index_range()
+        mode = DECIMATION_MODES[self.decimation_combobox.currentIndex()]
+        if mode == "Off":
+            curve.setData(self.x_data[start:stop], y_data[start:stop])
+            return
+
+        width_px = max(1, int(self.plot_widget.getViewBox().width()))
+        if mode == "LTTB":
+            indices, values = lttb_decimate(y_data[start:stop], 2 * width_px, start)
         else:
-            self.plot_graph_ch1.setData(self.x_data, self.y_data_ch1)
-            self.plot_graph_ch2.setData(self.x_data, self.y_data_ch2)
+            indices, values = minmax_decimate(y_data[start:stop], width_px, start)
+        curve.setData(self.x_data[indices], values)
 
     def closeEvent(self, event):
+        self.reconfig_scheduler.timer.stop()
+        self.board_bridge.close()
+        self.board_client.close()
         if self.adcreceiver.isRunning():
             self.adcreceiver.stop()
             self.adcreceiver.deleteLater()
+        if self.acquisition.recorder is not None:
+            self.acquisition.recorder.close()
+        if self.dsp_pool is not None:
+            self.dsp_pool.close()
+            self.acquisition.ring.close()
 
         # reset_voltage_port1 = self.tab1.get_reset_voltage()
         # reset_voltage_port2 = self.tab2.get_reset_voltage()
 
         # stop_sweep(pita, RP_DAC_PORT_1, reset_voltage_port1)
         # stop_sweep(pita, RP_DAC_PORT_2, reset_voltage_port2)
-        pita.stop_dac_sweep(port=ALL_BRAM_DAC_PORTS)
-        pita.close()
+        if pita.is_connected:
+            with board_lock(pita):
+                pita.stop_dac_sweep(port=ALL_BRAM_DAC_PORTS)
+            dac_waveforms.invalidate()
+            pita.close()
 
         event.accept()
 
     def restart_adc_receiver(self):
         if self.adcreceiver.isRunning():
             self.adcreceiver.stop()
-        time.sleep(0.1)
 
         self.get_adc_config()
         self.adcreceiver.set_parameters(
@@ -305,4 +773,6 @@ if __name__ == "__main__":
     app = QApplication(sys.argv)
     window = MainWindow()
     window.show()
+    profiler.start_from_environment()
+    pita.warm_up()
     sys.exit(app.exec())
@@ -0,0 +1,120 @@
+"""
+Per-stage latency statistics of the acquisition pipeline.
+
+The stages of a frame, all measured with time.monotonic():
+
+    receive     receiving the RAM block from the board (AdcAcquisition)
+    hop         ring commit to frame_ready in the GUI thread
+    unpack      AdcUnpacker.unpack in update_plot
+    plot        averaging, time axis and setData in update_plot
+    end_to_end  ring commit to the end of update_plot
+
+Every stage keeps the last `window` durations in a ring, percentiles are only
+computed when summary() is called. Callers check `enabled` before taking any
+timestamps, so a disabled PipelineStats costs one attribute lookup per stage.
+"""
+import csv
+import json
+
+import numpy as np
+
+STAGES = ("receive", "hop", "unpack", "plot", "end_to_end")
+PERCENTILES = (50, 95, 99)
+DEFAULT_WINDOW = 1024
+
+
+class PipelineStats:
+    def __init__(self, window=DEFAULT_WINDOW):
+        self.window = window
+        self.enabled = False
+        self.reset()
+
+    def reset(self):
+        self.durations = {stage: np.zeros(self.window) for stage in STAGES}
+        self.counts = dict.fromkeys(STAGES, 0)
+        self.queue_depths = np.zeros(self.window, dtype=np.int64)
+        self.queue_samples = 0
+        self.frames_dropped = 0
+
+    def record(self, stage, seconds):
+        count = self.counts[stage]
+        self.durations[stage][count % self.window] = seconds
+        self.counts[stage] = count + 1
+
+    def record_queue(self, depth, frames_dropped):
+        """Ring backlog when a frame was committed and the drop count so far"""
+
+        self.queue_depths[self.queue_samples % self.window] = depth
+        self.queue_samples += 1
+        self.frames_dropped = frames_dropped
+
+    def summary(self):
+        """
+        Statistics over the current window.
+
+        :return: Dict with, per stage, the count and p50/p95/p99/max in ms, and
+            the queue depth percentiles and dropped frames under "queue".
+        """
+        summary = {}
+        for stage in STAGES:
+            count = self.counts[stage]
+            entry = {"count": count}
+            if count:
+                values = self.durations[stage][:min(count, self.window)] * 1e3
+                for percentile, value in zip(PERCENTILES, np.percentile(values, PERCENTILES)):
+                    entry[f"p{percentile}_ms"] = float(value)
+                entry["max_ms"] = float(values.max())
+            summary[stage] = entry
+
+        queue = {"count": self.queue_samples, "frames_dropped": self.frames_dropped}
+        if self.queue_samples:
+            depths = self.queue_depths[:min(self.queue_samples, self.window)]
+            for percentile, value in zip(PERCENTILES, np.percentile(depths, PERCENTILES)):
+                queue[f"p{percentile}_depth"] = float(value)
+            queue["max_depth"] = int(depths.max())
+        summary["queue"] = queue
+        return summary
+
+    def status_text(self):
+        """One line for the status bar, p50/p95/p99 in ms per stage"""
+
+        summary = self.summary()
+        parts = []
+        for stage in STAGES:
+            entry = summary[stage]
+            if entry["count"]:
+                parts.append(
+                    f"{stage} {entry['p50_ms']:.1f}/{entry['p95_ms']:.1f}/{entry['p99_ms']:.1f}"
+                )
+        queue = summary["queue"]
+        if queue["count"]:
+            parts.append(f"queue p95 {queue['p95_depth']:.0f}")
+        return "Latency ms (p50/p95/p99): " + "   ".join(parts) if parts else "Latency: no frames"
+
+    def export(self, path):
+        """Write summary() to path, as CSV if it ends in .csv and as JSON otherwise"""
+
+        summary = self.summary()
+        if str(path).lower().endswith(".csv"):
+            fields = ["stage", "unit", "count"] + [f"p{p}" for p in PERCENTILES] + ["max"]
+            with open(path, "w", newline="") as f:
+                writer = csv.DictWriter(f, fieldnames=fields)
+                writer.writeheader()
+                for stage in STAGES:
+                    entry = summary[stage]
+                    row = {"stage": stage, "unit": "ms", "count": entry["count"]}
+                    row.update({f"p{p}": entry.get(f"p{p}_ms", "") for p in PERCENTILES})
+                    row["max"] = entry.get("max_ms", "")
+                    writer.writerow(row)
+                queue = summary["queue"]
+                row = {"stage": "queue_depth", "unit": "frames", "count": queue["count"]}
+                row.update({f"p{p}": queue.get(f"p{p}_depth", "") for p in PERCENTILES})
+                row["max"] = queue.get("max_depth", "")
+                writer.writerow(row)
+        else:
+            with open(path, "w") as f:
+                json.dump(summary, f, indent=2)
+
+
+# Shared by the receiver thread and the GUI
+pipeline_stats = PipelineStats()
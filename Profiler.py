@@ -0,0 +1,140 @@
+"""
+On-demand profiling of the receiver thread and the GUI thread.
+
+profiler.start(seconds) arms a profiling session, from the Diagnostics menu or
+at startup with the environment variable ADC_GUI_PROFILE=<seconds>. cProfile
+only profiles the thread that enables it, so every thread to be profiled calls
+profiler.check(name) once per loop iteration: the first call after start()
+enables a profiler for that thread, the first call after the deadline writes
+it to <output_dir>/<name>.prof and <name>.txt. tracemalloc runs process wide
+and is written to memory.txt and memory.tracemalloc when the session ends.
+
+From Python 3.12 on cProfile is built on sys.monitoring, which allows only
+one active profiler per process. There the first thread calling check() is
+profiled and the others are listed in skipped_threads.
+
+When no session is armed check() only tests one attribute.
+"""
+import cProfile
+import io
+import os
+import pstats
+import sys
+import threading
+import time
+import tracemalloc
+
+PROFILE_ENV = "ADC_GUI_PROFILE"
+TOP_ENTRIES = 40
+SINGLE_PROFILER = sys.version_info >= (3, 12)
+
+
+class Profiler:
+    def __init__(self):
+        self.active = False
+        self.deadline = 0.0
+        self.output_dir = None
+        self.memory = False
+        self.profiles = {}
+        self.finished_threads = []
+        self.skipped_threads = []
+        self.lock = threading.Lock()
+
+    def start(self, duration_s, output_dir=None, memory=True):
+        """
+        Profile every thread calling check() for duration_s seconds.
+
+        :return: The directory the stats files are written to.
+        """
+        with self.lock:
+            if self.active:
+                return self.output_dir
+            self.output_dir = output_dir or time.strftime("profile_%Y%m%d_%H%M%S")
+            os.makedirs(self.output_dir, exist_ok=True)
+            self.memory = memory and not tracemalloc.is_tracing()
+            if self.memory:
+                tracemalloc.start()
+            self.profiles = {}
+            self.finished_threads = []
+            self.skipped_threads = []
+            self.deadline = time.monotonic() + duration_s
+            self.active = True
+        return self.output_dir
+
+    def start_from_environment(self):
+        """Start a session if ADC_GUI_PROFILE holds a duration in seconds"""
+
+        duration_s = os.environ.get(PROFILE_ENV)
+        if duration_s:
+            return self.start(float(duration_s))
+        return None
+
+    def check(self, name):
+        """Call once per iteration from each thread to profile, name labels the thread"""
+
+        if not self.active:
+            return
+        if time.monotonic() < self.deadline:
+            if name not in self.profiles and name not in self.finished_threads:
+                self.enable(name)
+        else:
+            self.stop_thread(name)
+
+    def enable(self, name):
+        if SINGLE_PROFILER and self.profiles:
+            self.skip_thread(name)
+            return
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            # Another profiler is active, e.g. of a thread that got here first
+            self.skip_thread(name)
+            return
+        self.profiles[name] = profile
+
+    def skip_thread(self, name):
+        if name not in self.skipped_threads:
+            self.skipped_threads.append(name)
+
+    def stop_thread(self, name):
+        """Write the profile of the calling thread, e.g. when its loop ends"""
+
+        profile = self.profiles.pop(name, None)
+        if profile is not None:
+            profile.disable()
+            self.write_profile(name, profile)
+            self.finished_threads.append(name)
+        if time.monotonic() >= self.deadline:
+            self.finish()
+
+    def finish(self):
+        with self.lock:
+            if not self.active or self.profiles:
+                # Other threads have not written their profile yet
+                return
+            if self.memory:
+                self.write_memory(tracemalloc.take_snapshot())
+                tracemalloc.stop()
+            self.active = False
+
+    def write_profile(self, name, profile):
+        path = os.path.join(self.output_dir, name)
+        profile.dump_stats(f"{path}.prof")
+        text = io.StringIO()
+        pstats.Stats(profile, stream=text).sort_stats("cumulative").print_stats(TOP_ENTRIES)
+        with open(f"{path}.txt", "w") as f:
+            f.write(text.getvalue())
+
+    def write_memory(self, snapshot):
+        path = os.path.join(self.output_dir, "memory")
+        snapshot.dump(f"{path}.tracemalloc")
+        current, peak = tracemalloc.get_traced_memory()
+        with open(f"{path}.txt", "w") as f:
+            f.write(f"traced memory: {current / 1e6:.1f} MB, peak {peak / 1e6:.1f} MB\n\n")
+            for stat in snapshot.statistics("lineno")[:TOP_ENTRIES]:
+                f.write(f"{stat}\n")
+
+
+# Shared by the receiver thread and the GUI
+profiler = Profiler()
@@ -0,0 +1,158 @@
+from PyQt6.QtCore import QObject, QTimer, pyqtSignal, pyqtSlot
+
+DEFAULT_DELAY_MS = 50
+
+
+class ReconfigScheduler(QObject):
+    """
+    Coalesce DAC and ADC reconfiguration requests.
+
+    Requests made within delay_ms of each other are collected and applied
+    together when the single-shot timer fires: at most one DAC configuration
+    per port and one ADC restart, however many widget signals fired. The
+    counters tell how many configurations and restarts were avoided.
+
+    DAC requests come from DacBramSettingsTab.update_dac_config and its sweep
+    button, which applies them with apply_dac_config. The ADC restart is done by
+    the restart_adc callable given with set_adc_restart.
+
+    With set_async_board the sweep stops and uploads of all pending ports are
+    handed to an AsyncBoardClient together and run off the GUI thread; the ADC
+    is restarted once they are done. Requests arriving meanwhile wait for the
+    next round. If they fail, failed is emitted with the error and the tabs
+    whose waveform did not get uploaded.
+    """
+
+    applied = pyqtSignal()
+    failed = pyqtSignal(str, list)
+
+    def __init__(self, delay_ms=DEFAULT_DELAY_MS, parent=None):
+        super().__init__(parent)
+        self.timer = QTimer(self)
+        self.timer.setSingleShot(True)
+        self.timer.setInterval(delay_ms)
+        self.timer.timeout.connect(self.apply)
+
+        self.restart_adc = None
+        self.board_bridge = None
+        self.board_client = None
+        self.upload_in_flight = False
+        self.tabs_in_flight = []
+        self.pending_dac_tabs = {}
+        self.pending_stops = {}
+        self.adc_restart_pending = False
+
+        self.dac_requests = 0
+        self.dac_applied = 0
+        self.adc_requests = 0
+        self.adc_restarts = 0
+
+    def set_adc_restart(self, restart_adc):
+        self.restart_adc = restart_adc
+
+    def set_async_board(self, board_bridge, board_client):
+        """Upload through board_client on the loop of board_bridge (AsyncBoard)"""
+
+        self.board_bridge = board_bridge
+        self.board_client = board_client
+        board_bridge.finished.connect(self.upload_finished)
+        board_bridge.failed.connect(self.upload_failed)
+
+    def request_dac_upload(self, tab):
+        """Apply the configuration of tab after the next quiet period"""
+
+        self.dac_requests += 1
+        # The newest request for a port wins, a stop requested before is void
+        self.pending_stops.pop(tab.channel, None)
+        self.pending_dac_tabs[tab.channel] = tab
+        self.timer.start()
+
+    def request_sweep_stop(self, tab, reset_voltage):
+        """Stop the sweep on the port of tab and restart the ADC, after the next quiet period"""
+
+        self.pending_dac_tabs.pop(tab.channel, None)
+        self.pending_stops[tab.channel] = (tab, reset_voltage)
+        self.request_adc_restart()
+
+    def request_adc_restart(self):
+        self.adc_requests += 1
+        self.adc_restart_pending = True
+        self.timer.start()
+
+    @property
+    def avoided(self):
+        """DAC configurations and ADC restarts that were requested but merged away"""
+
+        return (self.dac_requests - self.dac_applied) + (self.adc_requests - self.adc_restarts)
+
+    @pyqtSlot()
+    def apply(self):
+        self.timer.stop()
+        if self.upload_in_flight:
+            self.timer.start()
+            return
+        tabs = list(self.pending_dac_tabs.values())
+        self.pending_dac_tabs.clear()
+        stops = list(self.pending_stops.values())
+        self.pending_stops.clear()
+
+        if self.board_bridge is None:
+            for tab, reset_voltage in stops:
+                tab.stop_dac_sweep(reset_voltage)
+            for tab in tabs:
+                self.dac_applied += 1
+                if tab.apply_dac_config():
+                    self.adc_requests += 1
+                    self.adc_restart_pending = True
+            self.restart_if_pending()
+            return
+
+        configs = []
+        self.tabs_in_flight = []
+        receiver = None
+        for tab in tabs:
+            self.dac_applied += 1
+            restart_adc, config = tab.prepare_dac_config()
+            if restart_adc:
+                self.adc_requests += 1
+                self.adc_restart_pending = True
+            if config is not None:
+                configs.append(config)
+                self.tabs_in_flight.append(tab)
+                # Stopped on the board thread, waiting for it would block the GUI
+                receiver = tab.adcreceiver
+        if configs or stops:
+            self.upload_in_flight = True
+            self.board_bridge.submit(
+                "dac-upload",
+                self.board_client.reconfigure(
+                    [(tab.channel, reset_voltage) for tab, reset_voltage in stops],
+                    configs,
+                    receiver,
+                ),
+            )
+        else:
+            self.restart_if_pending()
+
+    @pyqtSlot(str, object)
+    def upload_finished(self, name, result):
+        if name == "dac-upload":
+            self.upload_in_flight = False
+            self.tabs_in_flight = []
+            self.restart_if_pending()
+
+    @pyqtSlot(str, str)
+    def upload_failed(self, name, error):
+        if name == "dac-upload":
+            self.upload_in_flight = False
+            tabs, self.tabs_in_flight = self.tabs_in_flight, []
+            self.failed.emit(error, tabs)
+            self.restart_if_pending()
+
+    def restart_if_pending(self):
+        if self.adc_restart_pending:
+            self.adc_restart_pending = False
+            if self.restart_adc is not None:
+                self.restart_adc()
+                self.adc_restarts += 1
+        self.applied.emit()
@@ -0,0 +1,209 @@
+"""
+Local stand-in for a Red Pitaya running the ADC/DAC server.
+
+EmulatorServer streams synthetic packed ADC words over TCP and
+EmulatedRedPitayaBoard is a client with the methods of rp.core.RedPitayaBoard
+used by this project, so the socket to screen path can run without hardware:
+
+    python RedPitayaEmulator.py --port 8900
+
+The protocol is line based. The client sends
+
+    RATE <adc sample rate in MHz>
+    ADC <number of packages> <package size in bytes>
+    DAC_START <port>
+    DAC_STOP <port>
+
+and the server answers an ADC command with the requested number of bytes.
+DAC commands are not answered, so they never interleave with ADC data.
+"""
+import argparse
+import socket
+import socketserver
+import threading
+import time
+from types import SimpleNamespace
+
+import numpy as np
+
+from AdcUnpacker import pack_adc_words
+
+EMULATOR_HOST = "127.0.0.1"
+EMULATOR_PORT = 8900
+DEFAULT_TCP_PKG_SIZE_BYTES = 64 * 1024
+DEFAULT_RAM_BYTES = 512 * 1024
+PATTERN_WORDS = 1 << 16
+PATTERN_PERIODS = 64
+SEND_CHUNK_BYTES = 64 * 1024
+
+
+def synthetic_pattern(n_words=PATTERN_WORDS, periods=PATTERN_PERIODS, noise_v=0.01):
+    """Packed words of a sine on channel 1 and a phase shifted, smaller sine on channel 2"""
+
+    rng = np.random.default_rng(0)
+    phase = 2 * np.pi * periods * np.arange(n_words) / n_words
+    ch1 = 0.8 * np.sin(phase) + noise_v * rng.standard_normal(n_words)
+    ch2 = 0.4 * np.sin(phase - np.pi / 4) + noise_v * rng.standard_normal(n_words)
+    return pack_adc_words(ch1, ch2)
+
+
+class EmulatorRequestHandler(socketserver.BaseRequestHandler):
+    def setup(self):
+        self.request.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        self.sample_rate = 125.0
+        self.offset = 0
+
+    def handle(self):
+        for line in self.request.makefile("rb"):
+            command, *args = line.decode().split()
+            if command == "RATE":
+                self.sample_rate = float(args[0])
+            elif command == "ADC":
+                self.stream(int(args[0]) * int(args[1]))
+            elif command == "DAC_START":
+                self.server.dac_running[args[0]] = True
+            elif command == "DAC_STOP":
+                self.server.dac_running[args[0]] = False
+
+    def stream(self, n_bytes):
+        """Send n_bytes of the synthetic pattern, paced to the configured byte rate"""
+
+        byte_rate = self.server.byte_rate
+        if byte_rate is None:
+            byte_rate = self.sample_rate * 1e6 * 4  # one 32 bit word per sample
+        pattern = self.server.pattern
+        pattern_bytes = len(pattern) // 2
+
+        start = time.monotonic()
+        sent = 0
+        while sent < n_bytes:
+            size = min(SEND_CHUNK_BYTES, n_bytes - sent, pattern_bytes)
+            self.request.sendall(pattern[self.offset:self.offset + size])
+            self.offset = (self.offset + size) % pattern_bytes
+            sent += size
+            if byte_rate:
+                delay = start + sent / byte_rate - time.monotonic()
+                if delay > 0:
+                    time.sleep(delay)
+
+
+class EmulatorServer(socketserver.ThreadingTCPServer):
+    """
+    TCP server streaming synthetic ADC data.
+
+    :param byte_rate: Bytes per second sent for ADC data. None follows the ADC
+        sample rate requested by the client, 0 sends as fast as possible.
+    """
+
+    allow_reuse_address = True
+    daemon_threads = True
+
+    def __init__(self, host=EMULATOR_HOST, port=EMULATOR_PORT, byte_rate=None):
+        super().__init__((host, port), EmulatorRequestHandler)
+        self.byte_rate = byte_rate
+        self.dac_running = {}
+        # Two copies of the pattern so every chunk can be sent as one slice
+        self.pattern = memoryview(np.tile(synthetic_pattern(), 2).tobytes())
+
+    @property
+    def port(self):
+        return self.server_address[1]
+
+    def start_in_background(self):
+        thread = threading.Thread(target=self.serve_forever, daemon=True)
+        thread.start()
+        return thread
+
+
+class EmulatedRedPitayaBoard:
+    """
+    Client for EmulatorServer with the RedPitayaBoard methods used in this project.
+
+    :param ram_bytes: Size of one emulated RAM block.
+    :param tcp_pkg_size_bytes: Size of one TCP package of ADC data.
+    """
+
+    def __init__(
+        self,
+        host=EMULATOR_HOST,
+        port=EMULATOR_PORT,
+        ram_bytes=DEFAULT_RAM_BYTES,
+        tcp_pkg_size_bytes=DEFAULT_TCP_PKG_SIZE_BYTES,
+        debug=False,
+        verbose=False,
+    ):
+        self.ram_bytes = ram_bytes
+        self.tcp_pkg_size_bytes = tcp_pkg_size_bytes
+        self.verbose = verbose
+        self.socket = socket.create_connection((host, port))
+        self.socket.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+
+    def send_command(self, *args):
+        if self.verbose:
+            print("emulator <-", *args)
+        self.socket.sendall((" ".join(str(arg) for arg in args) + "\n").encode())
+
+    def set_adc_sample_rate(self, sample_rate):
+        self.send_command("RATE", sample_rate)
+
+    def start_adc_sampling(self, number_tcp_pkg):
+        self.send_command("ADC", number_tcp_pkg, self.tcp_pkg_size_bytes)
+
+    def receive_adc_data_package_into(self, view):
+        """Fill the writable buffer view with ADC data using socket.recv_into"""
+
+        view = memoryview(view).cast("B")
+        received = 0
+        while received < len(view):
+            n = self.socket.recv_into(view[received:])
+            if n == 0:
+                raise ConnectionError("Emulator closed the connection")
+            received += n
+
+    def receive_adc_data_package(self, n_bytes):
+        data = bytearray(n_bytes)
+        self.receive_adc_data_package_into(data)
+        return bytes(data)
+
+    def start_dac_sweep(self, port):
+        self.send_command("DAC_START", port)
+
+    def stop_dac_sweep(self, port=None):
+        self.send_command("DAC_STOP", port)
+
+    def close(self):
+        self.socket.close()
+
+
+def initEmulatedAdcReceiver(board, sample_rate, mode, dac_steps, dwell_time_ms, verbose):
+    """Counterpart of source.initAdcReceiver for an EmulatedRedPitayaBoard"""
+
+    board.set_adc_sample_rate(sample_rate)
+    return {
+        "adc": {"tcp": max(1, board.ram_bytes // board.tcp_pkg_size_bytes)},
+        "ram": SimpleNamespace(tcp_pkg_size_bytes=board.tcp_pkg_size_bytes),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Red Pitaya ADC/DAC server emulator")
+    parser.add_argument("--host", default=EMULATOR_HOST)
+    parser.add_argument("--port", type=int, default=EMULATOR_PORT)
+    parser.add_argument(
+        "--byte-rate",
+        type=float,
+        default=None,
+        help="bytes/s of ADC data, default follows the sample rate, 0 is unlimited",
+    )
+    args = parser.parse_args()
+
+    server = EmulatorServer(args.host, args.port, args.byte_rate)
+    print(f"Red Pitaya emulator listening on {args.host}:{server.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        server.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,83 @@
+import time
+
+from AdcReceiver import AdcReceiverThread
+from CaptureRecorder import CaptureReader, MODES
+
+MODE_NAMES = {value: name for name, value in MODES.items()}
+
+
+class CaptureReplayThread(AdcReceiverThread):
+    """
+    Frame source replaying a capture written by CaptureRecorder.
+
+    Stands in for AdcReceiverThread: frames are copied from the memory mapped
+    capture into the same ring and announced with frameReady. Sample rate and mode
+    are taken from the capture, not from set_parameters.
+
+    :param speed: 1 replays in real time, N at N times the recorded speed and
+        0 as fast as the pacing policy allows.
+    :param loop: Start again at the first frame after the last one.
+    """
+
+    def __init__(self, path, speed=1.0, loop=False):
+        super().__init__()
+        self.reader = CaptureReader(path)
+        self.speed = speed
+        self.loop = loop
+        self.frame_index = 0
+
+    def set_parameters(self, sample_rate, mode, dac_steps, dwell_time_ms, ram_size=None):
+        # Everything needed to show the frames is stored in the capture
+        pass
+
+    def run(self):
+        acquisition = self.acquisition
+        acquisition.running = True
+        acquisition.measured_fps = 0.0
+        acquisition.last_frame_time = None
+        self.frame_index = 0
+        index = self.reader.index
+        if len(index) == 0:
+            return
+
+        restart_clock = True
+        while acquisition.running:
+            if self.frame_index >= len(index):
+                if not self.loop:
+                    break
+                self.frame_index = 0
+                restart_clock = True
+
+            entry = index[self.frame_index]
+            if restart_clock:
+                replay_start = time.monotonic()
+                capture_start = entry["timestamp"]
+                restart_clock = False
+            if self.speed > 0:
+                acquisition.sleep_until(
+                    replay_start + (entry["timestamp"] - capture_start) / self.speed
+                )
+            else:
+                acquisition.pace()
+            if not acquisition.running:
+                break
+            acquisition.last_arm_time = time.monotonic()
+
+            acquisition.sample_rate = float(entry["sample_rate"])
+            acquisition.mode = MODE_NAMES.get(int(entry["mode"]))
+            acquisition.dac_steps = int(entry["dac_steps"])
+            acquisition.dwell_time_ms = float(entry["dwell_time_ms"])
+
+            offset, nbytes = int(entry["offset"]), int(entry["nbytes"])
+            ring = acquisition.ring
+            ring.resize(nbytes)
+            ring.writable_slot()[:] = self.reader.data[offset:offset + nbytes]
+            seq = ring.commit(acquisition.sample_rate)
+            self.frameReady.emit(seq)
+            averager = acquisition.averager
+            if averager is not None and acquisition.mode == "Sync":
+                averager.add(
+                    ring, seq, acquisition.sample_rate, acquisition.dac_steps, acquisition.dwell_time_ms
+                )
+            acquisition.update_measured_fps()
+            self.frame_index += 1
@@ -46,5 +46,18 @@ class AdcSignalManager(QObject):
         widget.mode_button_group.buttons()[0].clicked.connect(widget.update_adc_config)
         widget.mode_button_group.buttons()[1].clicked.connect(widget.update_adc_config)
         widget.ram_size_combobox.currentIndexChanged.connect(widget.update_adc_config)
+        widget.input_range_combobox.currentIndexChanged.connect(widget.set_input_range)
+        widget.display_fps_combobox.currentIndexChanged.connect(widget.set_display_fps)
+        widget.decimation_combobox.currentIndexChanged.connect(widget.draw_curves)
+        widget.pacing_combobox.currentIndexChanged.connect(widget.set_acquisition_pacing)
+        widget.record_checkbox.clicked.connect(widget.toggle_recording)
+        widget.capture_dir_button.clicked.connect(widget.choose_capture_dir)
+        widget.averaging_checkbox.clicked.connect(widget.reset_averaging)
+        widget.averaging_mode_combobox.currentIndexChanged.connect(widget.reset_averaging)
+        widget.averaging_frames_edit.returnPressed.connect(widget.reset_averaging)
+        widget.latency_checkbox.clicked.connect(widget.toggle_latency_stats)
+        widget.latency_export_button.clicked.connect(widget.export_latency_stats)
+        widget.profile_action.triggered.connect(widget.start_profiling)
         widget.tab1.update_adc.connect(widget.update_adc_config)
         widget.tab2.update_adc.connect(widget.update_adc_config)
+        widget.reconfig_scheduler.failed.connect(widget.show_dac_upload_error)
@@ -0,0 +1,16 @@
+from functools import lru_cache
+
+import numpy as np
+
+
+@lru_cache(maxsize=8)
+def time_axis(total_samples, adc_sample_rate):
+    """
+    Time of each sample in seconds, for total_samples samples at adc_sample_rate MHz.
+
+    The axis only changes with the sample rate or the RAM size, so it is cached
+    and shared between frames. The returned array is read-only.
+    """
+    x_data = np.arange(total_samples) / (adc_sample_rate * 1e6)
+    x_data.setflags(write=False)
+    return x_data
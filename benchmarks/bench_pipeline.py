@@ -0,0 +1,344 @@
+"""
+End-to-end acquisition benchmark: emulator socket -> AdcAcquisition -> MainWindow.
+
+Runs against a local RedPitayaEmulator for every ADC sample rate and RAM size
+and writes the results as JSON:
+
+    python benchmarks/bench_pipeline.py --duration 2 --output bench_pipeline.json
+
+With PyQt6, pyqtgraph and rp installed the frames go through a MainWindow on
+the offscreen Qt platform: update_plot with setData, and a synchronous repaint
+of the plot after every rendered tick, timed as "paint". Without them, or with
+--no-window, DisplayLoop stands in for the window: it unpacks and decimates the
+newest frame per tick like update_plot, but sets no curve data and paints
+nothing. The stages are recorded in a PipelineStats (see there for their
+meaning).
+
+Every run is a separate process, so the reported peak RSS belongs to that run
+alone.
+"""
+import argparse
+import json
+import os
+import platform
+import queue
+import resource
+import subprocess
+import sys
+import threading
+import time
+
+os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np
+
+from Acquisition import AdcAcquisition, PACING_NONE
+from AdcUnpacker import AdcUnpacker
+from Decimation import minmax_decimate
+from PipelineStats import PipelineStats, STAGES
+from RedPitayaEmulator import (
+    EmulatedRedPitayaBoard,
+    EmulatorServer,
+    initEmulatedAdcReceiver,
+)
+from TimeAxis import time_axis
+
+try:
+    from PyQt6.QtCore import QEventLoop, QTimer
+    from PyQt6.QtWidgets import QApplication
+
+    from AdcReceiver import AdcReceiverThread
+    from GUI import MainWindow, PACING_OPTIONS
+except ImportError:
+    # PyQt6, pyqtgraph or rp missing: only the Qt-free DisplayLoop can run
+    MainWindow = None
+
+SAMPLE_RATES_MHZ = [
+    125, 62.5, 31.25, 25, 15.625, 12.5, 7.8125, 6.25,
+    5, 3.90625, 3.125, 2.5, 1.25, 1, 0.625, 0.5,
+]
+RAM_SIZES_KB = [512, 256, 128, 64]
+DISPLAY_FPS = 30
+PLOT_WIDTH_PX = 1600
+STATS_WINDOW = 1 << 16
+
+
+class DisplayLoop(threading.Thread):
+    """
+    Stands in for MainWindow without Qt: frames arrive through a queue, the
+    newest is unpacked and decimated per tick. No curve data is set and nothing
+    is painted.
+    """
+
+    def __init__(self, acquisition, fps=DISPLAY_FPS, width_px=PLOT_WIDTH_PX):
+        super().__init__(name="display", daemon=True)
+        self.acquisition = acquisition
+        self.tick_s = 1 / fps
+        self.width_px = width_px
+        self.frames = queue.SimpleQueue()
+        self.unpacker = AdcUnpacker(np.float32)
+        self.spare_unpacker = AdcUnpacker(np.float32)
+        self.running = True
+        self.frames_rendered = 0
+        self.frames_skipped = 0
+        self.frames_overwritten = 0
+        self.curves = []
+
+    def run(self):
+        ring = self.acquisition.ring
+        stats = self.acquisition.stats
+        latest = None
+        next_tick = time.monotonic() + self.tick_s
+        while self.running:
+            try:
+                seq = self.frames.get(timeout=max(0.0, next_tick - time.monotonic()))
+                stats.record("hop", time.monotonic() - ring.timestamps[seq % ring.n_slots])
+                if latest is not None:
+                    self.frames_skipped += 1
+                latest = seq
+                continue
+            except queue.Empty:
+                pass
+            next_tick += self.tick_s
+            if latest is not None:
+                self.render(latest)
+                latest = None
+
+    def render(self, seq):
+        ring = self.acquisition.ring
+        stats = self.acquisition.stats
+        frame = ring.read(seq)
+        if frame is None:
+            self.frames_overwritten += 1
+            return
+        committed = ring.timestamps[seq % ring.n_slots]
+        unpack_start = time.monotonic()
+        ch1, ch2 = self.spare_unpacker.unpack(frame)
+        if not ring.is_valid(seq):
+            self.frames_overwritten += 1
+            return
+        self.unpacker, self.spare_unpacker = self.spare_unpacker, self.unpacker
+        plot_start = time.monotonic()
+        stats.record("unpack", plot_start - unpack_start)
+        x_data = time_axis(len(ch1), self.acquisition.sample_rate)
+        self.curves = []
+        for y_data in (ch1, ch2):
+            indices, values = minmax_decimate(y_data, self.width_px)
+            self.curves.append((x_data[indices], values))
+        now = time.monotonic()
+        stats.record("plot", now - plot_start)
+        stats.record("end_to_end", now - committed)
+        self.frames_rendered += 1
+
+
+def new_acquisition_stats():
+    stats = PipelineStats(STATS_WINDOW)
+    stats.enabled = True
+    return stats
+
+
+def percentiles_ms(values):
+    if not values:
+        return None
+    p50, p95, p99 = np.percentile(np.asarray(values) * 1e3, [50, 95, 99])
+    return {"count": len(values), "p50_ms": p50, "p95_ms": p95, "p99_ms": p99}
+
+
+def run_once(port, sample_rate, ram_kb, duration_s):
+    """One acquisition of duration_s seconds through DisplayLoop, in the calling process"""
+
+    board = EmulatedRedPitayaBoard(port=port, ram_bytes=ram_kb * 1024)
+    acquisition = AdcAcquisition(board, initEmulatedAdcReceiver)
+    acquisition.stats = new_acquisition_stats()
+    acquisition.set_parameters(sample_rate, "Async", 1000, 8e-06, ram_kb)
+    acquisition.set_acquisition_options(True, PACING_NONE)
+
+    display = DisplayLoop(acquisition)
+    acquisition.on_frame = display.frames.put
+    receiver = threading.Thread(target=acquisition.acquire, name="receiver", daemon=True)
+
+    start = time.monotonic()
+    display.start()
+    receiver.start()
+    time.sleep(duration_s)
+    acquisition.stop()
+    receiver.join()
+    display.running = False
+    display.join()
+    elapsed = time.monotonic() - start
+    board.close()
+
+    return run_result(
+        "DisplayLoop", acquisition, sample_rate, ram_kb, elapsed,
+        display.frames_rendered, display.frames_skipped, display.frames_overwritten,
+        paint_ms=None,
+    )
+
+
+def run_once_window(port, sample_rate, ram_kb, duration_s):
+    """One acquisition of duration_s seconds through MainWindow, in the calling process"""
+
+    app = QApplication.instance() or QApplication(sys.argv)
+    board = EmulatedRedPitayaBoard(port=port, ram_bytes=ram_kb * 1024)
+    receiver = AdcReceiverThread(board, init_adc=initEmulatedAdcReceiver)
+    window = MainWindow(adcreceiver=receiver)
+    window.resize(PLOT_WIDTH_PX, 900)
+    window.show()
+
+    acquisition = window.acquisition
+    acquisition.stats = new_acquisition_stats()
+    combobox = window.adc_sample_rate_combobox
+    rates = [float(combobox.itemText(i).split()[0]) for i in range(combobox.count())]
+    combobox.setCurrentIndex(rates.index(sample_rate))
+    window.ram_size_combobox.setCurrentText(str(ram_kb))
+    window.pacing_combobox.setCurrentIndex(
+        [pacing for _, pacing, _ in PACING_OPTIONS].index(PACING_NONE)
+    )
+
+    # Paint synchronously after every rendered tick, the event loop would
+    # otherwise paint whenever it gets to it
+    paint_times = []
+    overwritten = 0
+
+    def render_and_paint():
+        nonlocal overwritten
+        pending = window.latest_frame_seq is not None
+        rendered = window.frames_rendered
+        window.render_latest_frame()
+        if window.frames_rendered == rendered:
+            overwritten += pending
+            return
+        paint_start = time.perf_counter()
+        window.plot_widget.viewport().repaint()
+        paint_times.append(time.perf_counter() - paint_start)
+
+    window.display_timer.timeout.disconnect()
+    window.display_timer.timeout.connect(render_and_paint)
+
+    start = time.monotonic()
+    window.start_button_clicked()
+    loop = QEventLoop()
+    QTimer.singleShot(int(duration_s * 1000), loop.quit)
+    loop.exec()
+    window.start_button_clicked()
+    elapsed = time.monotonic() - start
+    window.close()
+    board.close()
+    app.processEvents()
+
+    return run_result(
+        "MainWindow", acquisition, sample_rate, ram_kb, elapsed,
+        window.frames_rendered, window.frames_skipped, overwritten,
+        paint_ms=percentiles_ms(paint_times),
+    )
+
+
+def run_result(display, acquisition, sample_rate, ram_kb, elapsed,
+               frames_rendered, frames_skipped, frames_overwritten, paint_ms):
+    ring = acquisition.ring
+    summary = acquisition.stats.summary()
+    return {
+        "display": display,
+        "sample_rate_mhz": sample_rate,
+        "ram_size_kb": ram_kb,
+        "frame_bytes": ring.frame_bytes,
+        "duration_s": elapsed,
+        "frames_received": ring.frames_written,
+        "mb_per_s": ring.frames_written * ring.frame_bytes / elapsed / 1e6,
+        "frames_rendered_per_s": frames_rendered / elapsed,
+        "frames_skipped": frames_skipped,
+        "frames_overwritten": frames_overwritten,
+        "frames_dropped": ring.frames_dropped,
+        "acquisition_fps": acquisition.measured_fps,
+        "latency_ms": {stage: summary[stage] for stage in STAGES},
+        "paint_ms": paint_ms,
+        "queue": summary["queue"],
+        "peak_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+    }
+
+
+def run_in_subprocess(port, sample_rate, ram_kb, duration_s, window=True):
+    output = subprocess.run(
+        [
+            sys.executable, os.path.abspath(__file__),
+            "--single", str(sample_rate), str(ram_kb),
+            "--port", str(port), "--duration", str(duration_s),
+        ] + ([] if window else ["--no-window"]),
+        check=True,
+        stdout=subprocess.PIPE,
+        text=True,
+    ).stdout
+    return json.loads(output)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="End-to-end acquisition benchmark")
+    parser.add_argument("--duration", type=float, default=2.0, help="seconds per run")
+    parser.add_argument("--output", default="bench_pipeline.json")
+    parser.add_argument(
+        "--unpaced", action="store_true", help="emulator sends as fast as possible"
+    )
+    parser.add_argument("--sample-rates", type=float, nargs="+", default=SAMPLE_RATES_MHZ)
+    parser.add_argument("--ram-sizes", type=int, nargs="+", default=RAM_SIZES_KB)
+    parser.add_argument(
+        "--no-window", action="store_true", help="use DisplayLoop even if Qt is installed"
+    )
+    # Used by run_in_subprocess
+    parser.add_argument("--single", nargs=2, metavar=("RATE", "RAM_KB"), help=argparse.SUPPRESS)
+    parser.add_argument("--port", type=int, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.single:
+        sample_rate, ram_kb = float(args.single[0]), int(args.single[1])
+        if MainWindow is None or args.no_window:
+            result = run_once(args.port, sample_rate, ram_kb, args.duration)
+        else:
+            result = run_once_window(args.port, sample_rate, ram_kb, args.duration)
+        print(json.dumps(result))
+        return
+    if MainWindow is None and not args.no_window:
+        print("PyQt6, pyqtgraph or rp not installed, measuring DisplayLoop instead of MainWindow")
+
+    server = EmulatorServer(port=0, byte_rate=0 if args.unpaced else None)
+    server.start_in_background()
+
+    runs = []
+    for sample_rate in args.sample_rates:
+        for ram_kb in args.ram_sizes:
+            result = run_in_subprocess(
+                server.port, sample_rate, ram_kb, args.duration, not args.no_window
+            )
+            runs.append(result)
+            print(
+                f"{sample_rate:>8} MHz {ram_kb:>4} KB: "
+                f"{result['mb_per_s']:8.1f} MB/s received, "
+                f"{result['frames_rendered_per_s']:5.1f} frames/s rendered, "
+                f"peak RSS {result['peak_rss_mb']:.0f} MB"
+            )
+
+    server.shutdown()
+    with open(args.output, "w") as f:
+        json.dump(
+            {
+                "meta": {
+                    "created": time.strftime("%Y-%m-%dT%H:%M:%S"),
+                    "python": platform.python_version(),
+                    "platform": platform.platform(),
+                    "numpy": np.__version__,
+                    "duration_s": args.duration,
+                    "paced": not args.unpaced,
+                    "display": "DisplayLoop" if MainWindow is None or args.no_window else "MainWindow",
+                    "display_fps": DISPLAY_FPS,
+                    "plot_width_px": PLOT_WIDTH_PX,
+                },
+                "runs": runs,
+            },
+            f,
+            indent=2,
+        )
+    print(f"Results written to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,56 @@
+"""
+Measure GUI import time and time to first paint, independent of the board.
+
+    python benchmarks/bench_startup.py [--connect]
+
+With --connect the background board connection is awaited as well and its
+duration reported. For a per-module breakdown use `python -X importtime main.py`.
+"""
+import argparse
+import os
+import sys
+import time
+
+start = time.perf_counter()
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def main():
+    parser = argparse.ArgumentParser(description="GUI startup benchmark")
+    parser.add_argument("--connect", action="store_true", help="also connect to the board")
+    args = parser.parse_args()
+
+    import_start = time.perf_counter()
+    from PyQt6.QtCore import QTimer
+    from PyQt6.QtWidgets import QApplication
+    from AdcReceiver import pita
+    from GUI import MainWindow
+    import_s = time.perf_counter() - import_start
+
+    app = QApplication(sys.argv)
+    window_start = time.perf_counter()
+    window = MainWindow()
+    window.show()
+    pita.warm_up()
+    first_paint = {}
+
+    def painted():
+        first_paint["window"] = time.perf_counter() - window_start
+        first_paint["process"] = time.perf_counter() - start
+        app.quit()
+
+    # Runs once the event loop has processed the initial paint events
+    QTimer.singleShot(0, painted)
+    app.exec()
+
+    print(f"import GUI:        {1e3 * import_s:8.1f} ms")
+    print(f"window to paint:   {1e3 * first_paint['window']:8.1f} ms")
+    print(f"process to paint:  {1e3 * first_paint['process']:8.1f} ms")
+    if args.connect:
+        pita.connect()
+        print(f"board connect:     {1e3 * pita.connect_duration_s:8.1f} ms")
+        pita.close()
+
+
+if __name__ == "__main__":
+    main()
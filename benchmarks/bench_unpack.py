@@ -0,0 +1,60 @@
+"""
+Compare AdcUnpacker with rp.adc.helpers.unpackADCData for every RAM size.
+
+    python benchmarks/bench_unpack.py [--repeat 50]
+"""
+import argparse
+import os
+import sys
+import timeit
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from rp.adc.helpers import unpackADCData
+from rp.ram.config import RAM_SIZE
+from AdcUnpacker import AdcUnpacker
+
+
+def ram_size_bytes(ram_size):
+    """RAM_SIZE members are named KB_<size>"""
+    return int(ram_size.name.split("_")[1]) * 1024
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[0])
+    parser.add_argument("--repeat", type=int, default=50)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    print(f"{'RAM size':>10} {'helper ms':>10} {'f64 ms':>8} {'f32 ms':>8} {'speedup':>8} {'max diff V':>11}")
+    for ram_size in RAM_SIZE:
+        n_words = ram_size_bytes(ram_size) // 4
+        words = rng.integers(-(2**31), 2**31 - 1, n_words, dtype=np.int64).astype(np.int32)
+
+        unpacker64 = AdcUnpacker(np.float64)
+        unpacker32 = AdcUnpacker(np.float32)
+        unpacker64.unpack(words)
+        unpacker32.unpack(words)
+
+        t_helper = timeit.timeit(lambda: unpackADCData(words, 1, rawData=False), number=args.repeat)
+        t_64 = timeit.timeit(lambda: unpacker64.unpack(words), number=args.repeat)
+        t_32 = timeit.timeit(lambda: unpacker32.unpack(words), number=args.repeat)
+
+        expected = unpackADCData(words, 1, rawData=False)
+        ch1, ch2 = unpacker64.unpack(words)
+        max_diff = max(
+            np.max(np.abs(np.asarray(expected[0]) - ch1)),
+            np.max(np.abs(np.asarray(expected[1]) - ch2)),
+        )
+
+        print(
+            f"{ram_size.name:>10} {1e3 * t_helper / args.repeat:10.3f} "
+            f"{1e3 * t_64 / args.repeat:8.3f} {1e3 * t_32 / args.repeat:8.3f} "
+            f"{t_helper / t_64:8.1f} {max_diff:11.2e}"
+        )
+
+
+if __name__ == "__main__":
+    main()
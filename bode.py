@@ -1,12 +1,21 @@
 import numpy as np
 import matplotlib.pyplot as plt
 import csv
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from multisine import MAX_DAC_STEPS, adc_samples_per_period, log_harmonics, multisine, transfer_function
 
 # Initialize the measurement: Configure DAC and ADC
 def init_measurement(frequency, amplitude):
     # DAC and ADC configuration logic here
     pass
 
+# Upload one period of an arbitrary waveform to the DAC BRAM and start it
+def init_waveform_measurement(waveform, dac_sample_rate):
+    # DAC BRAM upload and ADC configuration logic here
+    pass
+
 # Acquire data from ADC
 def acquire_data(duration, sampling_rate):
     # ADC data acquisition logic here
@@ -27,6 +36,13 @@ def calculate_magnitude_phase(input_signal, output_signal, sampling_rate):
 
     return magnitude, phase
 
+# Measure magnitude and phase at a single frequency
+def measure_frequency(freq, amplitude, duration=1, sampling_rate=1e6):
+    init_measurement(freq, amplitude)
+    input_signal = acquire_data(duration=duration, sampling_rate=sampling_rate)
+    output_signal = acquire_data(duration=duration, sampling_rate=sampling_rate)
+    return calculate_magnitude_phase(input_signal, output_signal, sampling_rate)
+
 # Sweep over the given frequency range
 def frequency_sweep(start_freq, end_freq, step_freq, amplitude):
     frequencies = np.arange(start_freq, end_freq, step_freq)
@@ -34,15 +50,119 @@ def frequency_sweep(start_freq, end_freq, step_freq, amplitude):
     phases = []
 
     for freq in frequencies:
-        init_measurement(freq, amplitude)
-        input_signal = acquire_data(duration=1, sampling_rate=1e6)  # Example parameters
-        output_signal = acquire_data(duration=1, sampling_rate=1e6)  # Example parameters
-        magnitude, phase = calculate_magnitude_phase(input_signal, output_signal, 1e6)
+        magnitude, phase = measure_frequency(freq, amplitude)  # Example parameters
         magnitudes.append(magnitude)
         phases.append(phase)
 
     return frequencies, magnitudes, phases
 
+# Sweep that starts on a coarse log grid and adds points only where the response
+# changes: an interval is halved (geometric mean) while linear interpolation in
+# log f misses a neighbouring point by more than mag_tol_db or phase_tol_deg.
+# If measure returns a third value, the uncertainty in dB, intervals next to
+# points above uncertainty_tol_db are refined as well. Stops when no interval
+# qualifies, max_points is reached or intervals get narrower than min_ratio.
+def adaptive_frequency_sweep(start_freq, end_freq, amplitude, n_initial=16, max_points=100,
+                             mag_tol_db=0.5, phase_tol_deg=5.0, uncertainty_tol_db=None,
+                             min_ratio=1.01, measure=measure_frequency):
+    def measure_all(freqs):
+        return [tuple(measure(freq, amplitude)) for freq in freqs]
+
+    frequencies = np.geomspace(start_freq, end_freq, min(n_initial, max_points))
+    results = measure_all(frequencies)
+
+    while len(frequencies) < max_points:
+        magnitudes_db = 20 * np.log10([r[0] for r in results])
+        phases_deg = np.degrees(np.unwrap([r[1] for r in results]))
+        log_f = np.log10(frequencies)
+
+        # Miss of the linear interpolation between the neighbours of each inner point
+        weight = (log_f[1:-1] - log_f[:-2]) / (log_f[2:] - log_f[:-2])
+        def interpolation_error(y):
+            return np.abs(y[1:-1] - (y[:-2] + weight * (y[2:] - y[:-2])))
+        # Interpolation error in units of the tolerance, above 1 flags a point
+        point_score = np.zeros(len(frequencies))
+        point_score[1:-1] = np.maximum(
+            interpolation_error(magnitudes_db) / mag_tol_db,
+            interpolation_error(phases_deg) / phase_tol_deg,
+        )
+        if uncertainty_tol_db is not None and len(results[0]) > 2:
+            point_score = np.maximum(
+                point_score, np.array([r[2] for r in results]) / uncertainty_tol_db
+            )
+
+        # Refine both intervals next to a flagged point, worst first if the
+        # point budget does not cover all of them
+        interval_score = np.maximum(point_score[:-1], point_score[1:])
+        refine = (interval_score > 1) & (frequencies[1:] / frequencies[:-1] > min_ratio)
+        candidates = np.flatnonzero(refine)
+        worst_first = candidates[np.argsort(-interval_score[candidates], kind="stable")]
+        intervals = np.sort(worst_first[:max_points - len(frequencies)])
+        if len(intervals) == 0:
+            break
+
+        new_frequencies = np.sqrt(frequencies[intervals] * frequencies[intervals + 1])
+        results += measure_all(new_frequencies)
+        frequencies = np.concatenate([frequencies, new_frequencies])
+        order = np.argsort(frequencies)
+        frequencies = frequencies[order]
+        results = [results[i] for i in order]
+
+    magnitudes = np.array([r[0] for r in results])
+    phases = np.array([r[1] for r in results])
+    return frequencies, magnitudes, phases
+
+# Sweep with hardware and analysis overlapped: while frequency k is analysed on a
+# worker thread, the DAC is already set to frequency k+1 and settling.
+# Yields (index, frequency, magnitude, phase) for each frequency as soon as it is done.
+def frequency_sweep_pipelined(frequencies, amplitude, settle_time=0.0, duration=1, sampling_rate=1e6):
+    if len(frequencies) == 0:
+        return
+
+    with ThreadPoolExecutor(max_workers=1) as analysis:
+        init_measurement(frequencies[0], amplitude)
+        settled_at = time.monotonic() + settle_time
+        pending = None
+
+        for index, freq in enumerate(frequencies):
+            remaining = settled_at - time.monotonic()
+            if remaining > 0:
+                time.sleep(remaining)
+            input_signal = acquire_data(duration=duration, sampling_rate=sampling_rate)
+            output_signal = acquire_data(duration=duration, sampling_rate=sampling_rate)
+
+            # Start the next frequency before analysing this one
+            if index + 1 < len(frequencies):
+                init_measurement(frequencies[index + 1], amplitude)
+                settled_at = time.monotonic() + settle_time
+            future = analysis.submit(
+                calculate_magnitude_phase, input_signal, output_signal, sampling_rate
+            )
+
+            if pending is not None:
+                yield pending[0], pending[1], *pending[2].result()
+            pending = (index, freq, future)
+
+        yield pending[0], pending[1], *pending[2].result()
+
+# Bode plot from a single acquisition: a crest factor optimised multisine excites
+# n_lines log spaced frequencies at once, H(f) is read from the excited FFT bins.
+# The ADC sample rate has to be an integer multiple of the DAC sample rate.
+def multisine_bode(start_freq, end_freq, amplitude, dac_sample_rate, adc_sample_rate,
+                   n_lines=100, n_steps=MAX_DAC_STEPS, duration=1):
+    # Before touching the hardware: the captures have to line up with the waveform
+    samples_per_period = adc_samples_per_period(n_steps, dac_sample_rate, adc_sample_rate)
+    harmonics = log_harmonics(n_steps, dac_sample_rate, start_freq, end_freq, n_lines)
+    waveform = multisine(n_steps, harmonics, amplitude)
+
+    init_waveform_measurement(waveform, dac_sample_rate)
+    input_signal = acquire_data(duration=duration, sampling_rate=adc_sample_rate)
+    output_signal = acquire_data(duration=duration, sampling_rate=adc_sample_rate)
+
+    H = transfer_function(input_signal, output_signal, samples_per_period, harmonics)
+    frequencies = harmonics * dac_sample_rate / n_steps
+    return frequencies, np.abs(H), np.angle(H)
+
 # Plot Bode plot
 def plot_bode(frequencies, magnitudes, phases):
     fig, ax1 = plt.subplots()
@@ -75,7 +195,12 @@ def main():
     step_freq = 100e3
     amplitude = 1.0
 
-    frequencies, magnitudes, phases = frequency_sweep(start_freq, end_freq, step_freq, amplitude)
+    frequencies = np.arange(start_freq, end_freq, step_freq)
+    magnitudes = np.empty(len(frequencies))
+    phases = np.empty(len(frequencies))
+    for index, freq, magnitude, phase in frequency_sweep_pipelined(frequencies, amplitude):
+        magnitudes[index], phases[index] = magnitude, phase
+        print(f"{index + 1}/{len(frequencies)}: {freq:.0f} Hz")
     plot_bode(frequencies, magnitudes, phases)
     save_data(frequencies, magnitudes, phases, 'bode_plot_data.csv')
 
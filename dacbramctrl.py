@@ -71,22 +71,6 @@ class DacBramSettingsTab(QGroupBox):
         self.update_frequency_options()
         self.update_signal_options()
 
-        # Signal slot connections
-        self.dac_steps_edit.textChanged.connect(self.validate_dac_steps)
-        self.dac_sample_rate_button.clicked.connect(self.update_dac_config)
-        self.signal_frequency_button.clicked.connect(self.show_signal_frequency)
-        #self.signal_frequency_button.clicked.connect(self.update_dac_config)
-        self.dac_sample_rate_combobox.currentIndexChanged.connect(self.update_dac_config)
-        self.dac_steps_edit.returnPressed.connect(self.show_signal_frequency)
-        self.dac_steps_edit.returnPressed.connect(self.update_dac_config)
-        self.signal_frequency_combobox.currentIndexChanged.connect(self.update_dac_config)
-        self.sine_button.clicked.connect(self.update_dac_config)
-        self.squareroot_button.clicked.connect(self.update_dac_config)
-        self.sawtooth_button.clicked.connect(self.update_dac_config)
-        self.amplitude_edit.returnPressed.connect(self.update_dac_config)
-        self.start_voltage_edit.returnPressed.connect(self.update_dac_config)
-        self.stop_voltage_edit.returnPressed.connect(self.update_dac_config)
-
     def setupUI(self):
         self.port_layout = QHBoxLayout()
         self.setLayout(self.port_layout)
@@ -0,0 +1,221 @@
+"""
+Acquisition without the GUI, for long unattended captures.
+
+Configures the ADC and the DAC BRAM ports and streams the raw frames to a
+capture (see CaptureRecorder) or to stdout, printing throughput statistics to
+stderr. Nothing in here imports Qt.
+
+    python headless.py --sample-rate 125 --mode Async --output run1
+    python headless.py --mode Sync --dac channel=0,signal=Sine,amplitude=0.5,steps=1000 --output - | ...
+    python headless.py --emulator localhost:8900 --duration 10 --output -
+"""
+import argparse
+import sys
+import time
+
+from Acquisition import AdcAcquisition, ADAPTIVE_POLL_S, PACING_NONE, PACING_FIXED
+from CaptureRecorder import CaptureRecorder
+
+RAM_SIZES_KB = [512, 256, 128, 64]
+DAC_DEFAULTS = {
+    "channel": 0,
+    "signal": "Sine",
+    "amplitude": 1.0,
+    "start": 0.0,
+    "stop": 1.0,
+    "steps": 1000,
+    "dwell": 8e-06,
+}
+
+
+def parse_dac_spec(text):
+    """'channel=0,signal=Sine,amplitude=0.5,steps=1000,dwell=8e-06' to a dict"""
+
+    spec = dict(DAC_DEFAULTS)
+    for item in filter(None, text.split(",")):
+        key, _, value = item.partition("=")
+        if key not in spec:
+            raise argparse.ArgumentTypeError(f"unknown DAC setting {key!r}, use {', '.join(spec)}")
+        spec[key] = value if key == "signal" else type(DAC_DEFAULTS[key])(float(value))
+    return spec
+
+
+def create_board(args):
+    """Board client and its ADC setup function"""
+
+    if args.emulator:
+        from RedPitayaEmulator import EmulatedRedPitayaBoard, initEmulatedAdcReceiver
+
+        host, _, port = args.emulator.partition(":")
+        board = EmulatedRedPitayaBoard(host, int(port), ram_bytes=args.ram_size * 1024)
+        return board, initEmulatedAdcReceiver
+
+    from rp.core import RedPitayaBoard
+    from source import initAdcReceiver
+
+    return RedPitayaBoard(debug=False, verbose=False, autoStartServer=False), initAdcReceiver
+
+
+def configure_dac(board, dac_specs, emulated):
+    if emulated:
+        # The emulator has no BRAM, it only takes note of the sweep
+        for spec in dac_specs:
+            board.start_dac_sweep(spec["channel"])
+        return
+
+    from DacWaveformCache import dac_waveforms
+
+    for spec in dac_specs:
+        dac_waveforms.upload(
+            board,
+            spec["signal"],
+            spec["amplitude"],
+            spec["start"],
+            spec["stop"],
+            spec["steps"],
+            spec["dwell"],
+            spec["channel"],
+        )
+
+
+def stop_dac(board, emulated):
+    if emulated:
+        board.stop_dac_sweep()
+    else:
+        from rp.constants import ALL_BRAM_DAC_PORTS
+
+        board.stop_dac_sweep(port=ALL_BRAM_DAC_PORTS)
+
+
+class ThroughputReport:
+    """Print frames, MB/s and losses every interval_s seconds"""
+
+    def __init__(self, acquisition, interval_s, stream=sys.stderr):
+        self.acquisition = acquisition
+        self.interval_s = interval_s
+        self.stream = stream
+        self.start = time.monotonic()
+        self.last_time = self.start
+        self.last_frames = 0
+
+    def __call__(self, force=False):
+        now = time.monotonic()
+        if not force and now - self.last_time < self.interval_s:
+            return
+        ring = self.acquisition.ring
+        if force:
+            # Final report, averaged over the whole run
+            frames, elapsed = ring.frames_written, max(now - self.start, 1e-9)
+        else:
+            frames, elapsed = ring.frames_written - self.last_frames, now - self.last_time
+        line = (
+            f"{now - self.start:8.1f} s  frames {ring.frames_written}  "
+            f"{frames / elapsed:.1f} fps  {frames * ring.frame_bytes / elapsed / 1e6:.1f} MB/s  "
+            f"dropped {ring.frames_dropped}"
+        )
+        recorder = self.acquisition.recorder
+        if recorder is not None:
+            line += f"  written {recorder.frames_written}  lost {recorder.frames_lost}"
+        print(line, file=self.stream, flush=True)
+        self.last_time = now
+        self.last_frames = ring.frames_written
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Red Pitaya ADC acquisition without GUI")
+    parser.add_argument("--sample-rate", type=float, default=125.0, help="ADC sample rate in MHz")
+    parser.add_argument("--mode", choices=["Async", "Sync"], default="Async")
+    parser.add_argument(
+        "--ram-size", type=int, choices=RAM_SIZES_KB, default=None,
+        help="RAM block in KB of the emulator (default 512), a board uses the size it is configured with",
+    )
+    parser.add_argument(
+        "--dac", type=parse_dac_spec, action="append", default=[], metavar="SPEC",
+        help="configure a DAC port, e.g. channel=0,signal=Sine,amplitude=0.5,steps=1000,dwell=8e-06; "
+        "the first one sets the period in Sync mode",
+    )
+    parser.add_argument("--output", default="-", help="capture path, '-' writes raw frames to stdout")
+    parser.add_argument("--duration", type=float, default=None, help="stop after this many seconds")
+    parser.add_argument("--frames", type=int, default=None, help="stop after this many frames")
+    parser.add_argument(
+        "--rate", type=float, default=None,
+        help="frames per second, default is as fast as the board delivers",
+    )
+    parser.add_argument("--capacity-gb", type=float, default=2.0, help="size of the capture file")
+    parser.add_argument("--stats-interval", type=float, default=1.0, help="seconds between reports")
+    parser.add_argument("--emulator", metavar="HOST:PORT", help="use a RedPitayaEmulator server")
+    args = parser.parse_args()
+    if args.ram_size is not None and not args.emulator:
+        # initAdcReceiver has no RAM size parameter
+        parser.error("--ram-size only applies to --emulator")
+    args.ram_size = args.ram_size or RAM_SIZES_KB[0]
+
+    board, init_adc = create_board(args)
+    configure_dac(board, args.dac, bool(args.emulator))
+
+    sync_dac = args.dac[0] if args.dac else DAC_DEFAULTS
+    acquisition = AdcAcquisition(board, init_adc)
+    acquisition.set_parameters(
+        args.sample_rate, args.mode, sync_dac["steps"], sync_dac["dwell"], args.ram_size
+    )
+    if args.rate:
+        acquisition.set_acquisition_options(True, PACING_FIXED, 1 / args.rate)
+    else:
+        acquisition.set_acquisition_options(True, PACING_NONE)
+
+    stdout = None
+    recorder = None
+    if args.output == "-":
+        stdout = sys.stdout.buffer
+    else:
+        recorder = acquisition.recorder = CaptureRecorder(
+            args.output, capacity_bytes=int(args.capacity_gb * 1024**3)
+        )
+    report = ThroughputReport(acquisition, args.stats_interval)
+    deadline = None if args.duration is None else time.monotonic() + args.duration
+
+    def on_frame(seq):
+        if stdout is not None:
+            # on_frame runs in the acquisition thread, the slot is not
+            # reused before it returns
+            stdout.write(acquisition.ring.read(seq).data)
+        elif recorder is not None:
+            # The capture writer is the reader of the ring, its losses are counted
+            # by the recorder
+            acquisition.ring.read(seq)
+            # Hold the loop back before the ring overtakes the capture writer
+            while recorder.queue.qsize() >= acquisition.ring.n_slots // 2 and acquisition.running:
+                time.sleep(ADAPTIVE_POLL_S)
+            if recorder.bytes_written + acquisition.ring.frame_bytes > len(recorder.data):
+                print("capture file is full", file=sys.stderr)
+                acquisition.stop()
+        report()
+        if (args.frames is not None and acquisition.ring.frames_written >= args.frames) or (
+            deadline is not None and time.monotonic() >= deadline
+        ):
+            acquisition.stop()
+
+    acquisition.on_frame = on_frame
+    try:
+        acquisition.acquire()
+    except KeyboardInterrupt:
+        pass
+    except BrokenPipeError:
+        # The reader of stdout went away
+        pass
+    finally:
+        if acquisition.recorder is not None:
+            acquisition.recorder.close()
+        report(force=True)
+        if stdout is not None:
+            try:
+                stdout.flush()
+            except BrokenPipeError:
+                pass
+        if args.dac:
+            stop_dac(board, bool(args.emulator))
+        board.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,98 @@
+import numpy as np
+from functools import lru_cache
+
+
+@lru_cache(maxsize=32)
+def reference_tables(n, fs, frequencies):
+    """
+    Factorised references exp(-j 2 pi f t) for n samples at fs.
+
+    The sample index is split as i = b * m + k with m = ceil(sqrt(n)), so that
+    exp(-j w i) = coarse[b] * fine[k]. Only about 2 * sqrt(n) exponentials per
+    frequency are needed and no (frequencies x n) table is ever built. Samples
+    after the last full block use the tail table.
+
+    Cached by (n, fs, frequencies), frequencies being a tuple. The returned
+    arrays are read-only.
+
+    :return: fine (F x m), coarse (F x n // m) and tail (F x n % m) tables.
+    """
+    w = (-2j * np.pi / fs) * np.asarray(frequencies, dtype=np.float64)[:, None]
+    m = int(np.ceil(np.sqrt(n)))
+    n_blocks = n // m
+    fine = np.exp(w * np.arange(m))
+    coarse = np.exp(w * (m * np.arange(n_blocks)))
+    tail = np.exp(w * np.arange(n_blocks * m, n))
+    for table in (fine, coarse, tail):
+        table.setflags(write=False)
+    return fine, coarse, tail
+
+
+def demodulate(signals, fs, frequencies):
+    """
+    Complex amplitude of every signal at every frequency (lock-in detection).
+
+    :param signals: Array of shape (..., n).
+    :param fs: Sampling frequency (Hz).
+    :param frequencies: Frequencies to detect (Hz).
+
+    :return: Complex amplitudes of shape (..., len(frequencies)).
+    """
+    signals = np.asarray(signals, dtype=np.float64)
+    n = signals.shape[-1]
+    fine, coarse, tail = reference_tables(n, fs, tuple(float(f) for f in frequencies))
+    n_blocks, m = coarse.shape[1], fine.shape[1]
+
+    head = signals[..., :n_blocks * m].reshape(signals.shape[:-1] + (n_blocks, m))
+    # (..., blocks, F): real matrix products, the signals are never cast to complex
+    partial = head @ fine.real.T + 1j * (head @ fine.imag.T)
+    result = np.einsum("...bf,fb->...f", partial, coarse)
+    result += signals[..., n_blocks * m:] @ tail.T
+    return result * (2 / n)
+
+
+def demodulate_per_frequency(signals, fs, frequencies):
+    """
+    Complex amplitude of row k of signals at frequencies[k].
+
+    For sweeps where one capture is taken per frequency.
+
+    :param signals: Array of shape (..., len(frequencies), n).
+
+    :return: Complex amplitudes of shape (..., len(frequencies)).
+    """
+    signals = np.asarray(signals, dtype=np.float64)
+    n = signals.shape[-1]
+    fine, coarse, tail = reference_tables(n, fs, tuple(float(f) for f in frequencies))
+    n_blocks, m = coarse.shape[1], fine.shape[1]
+
+    head = signals[..., :n_blocks * m].reshape(signals.shape[:-1] + (n_blocks, m))
+    # (..., F, blocks): one matrix-vector product per frequency
+    partial = (head @ fine.real[:, :, None])[..., 0] + 1j * (head @ fine.imag[:, :, None])[..., 0]
+    result = np.einsum("...fb,fb->...f", partial, coarse)
+    result += np.einsum("...fn,fn->...f", signals[..., n_blocks * m:], tail)
+    return result * (2 / n)
+
+
+def bode_response(input_signal, output_signal, fs, frequencies, per_frequency=False):
+    """
+    Magnitude and phase of the transfer function from input to output signal.
+
+    Both signals are demodulated together in one pass.
+
+    :param input_signal: Array of shape (n,), or (len(frequencies), n) with
+        per_frequency=True.
+    :param output_signal: Same shape as input_signal.
+    :param fs: Sampling frequency (Hz).
+    :param frequencies: Frequencies to evaluate (Hz).
+    :param per_frequency: Row k of the signals belongs to frequencies[k].
+
+    :return: Magnitude and phase (in degrees) at each frequency.
+    """
+    signals = np.stack([input_signal, output_signal])
+    if per_frequency:
+        phasors = demodulate_per_frequency(signals, fs, frequencies)
+    else:
+        phasors = demodulate(signals, fs, frequencies)
+    H = phasors[1] / phasors[0]
+    return np.abs(H), np.degrees(np.angle(H))
@@ -1,9 +1,37 @@
-from GUI import MainWindow
+import argparse
 import sys
-from PyQt6.QtWidgets import QApplication
 
 if __name__ == "__main__":
-    app = QApplication(sys.argv)
-    window = MainWindow()
+    from PyQt6.QtWidgets import QApplication
+
+    from GUI import MainWindow
+    from AdcReceiver import pita
+    from Profiler import profiler
+
+    parser = argparse.ArgumentParser(description="Red Pitaya ADC/DAC GUI")
+    parser.add_argument("--replay", metavar="CAPTURE", help="show a recorded capture instead of the board")
+    parser.add_argument("--speed", type=float, default=1.0, help="replay speed, 0 is as fast as possible")
+    parser.add_argument("--loop", action="store_true", help="repeat the replay")
+    parser.add_argument(
+        "--dsp-workers", type=int, default=0, metavar="N",
+        help="analyse frames in N worker processes instead of the GUI thread",
+    )
+    args, qt_args = parser.parse_known_args()
+
+    app = QApplication(sys.argv[:1] + qt_args)
+    if args.replay:
+        from ReplaySource import CaptureReplayThread
+
+        window = MainWindow(
+            adcreceiver=CaptureReplayThread(args.replay, args.speed, args.loop),
+            dsp_workers=args.dsp_workers,
+        )
+    else:
+        window = MainWindow(dsp_workers=args.dsp_workers)
     window.show()
+    # ADC_GUI_PROFILE=<seconds> profiles the start of the session
+    profiler.start_from_environment()
+    if not args.replay:
+        # Connect to the board in the background while the window paints
+        pita.warm_up()
     sys.exit(app.exec())
@@ -0,0 +1,123 @@
+import numpy as np
+
+# Largest waveform that fits the DAC BRAM, see DacBramSettingsTab.validate_dac_steps
+MAX_DAC_STEPS = 16000
+
+
+def crest_factor(waveform):
+    return np.max(np.abs(waveform)) / np.sqrt(np.mean(waveform**2))
+
+
+def log_harmonics(n_steps, dac_sample_rate, start_freq, end_freq, n_lines):
+    """
+    Log spaced harmonics of a waveform period of n_steps DAC steps.
+
+    Harmonic k has the frequency k * dac_sample_rate / n_steps. Frequencies are
+    rounded to the nearest harmonic, so fewer than n_lines harmonics are returned
+    where the grid is coarser than the requested spacing.
+
+    :return: Sorted, unique harmonic numbers.
+    """
+    f_resolution = dac_sample_rate / n_steps
+    k_min = max(1, int(np.ceil(start_freq / f_resolution)))
+    k_max = min(n_steps // 2 - 1, int(end_freq / f_resolution))
+    if k_max < k_min:
+        raise ValueError(
+            f"No harmonic between {start_freq} and {end_freq} Hz, "
+            f"the frequency resolution is {f_resolution} Hz"
+        )
+    harmonics = np.geomspace(k_min, k_max, n_lines)
+    return np.unique(np.round(harmonics).astype(int))
+
+
+def multisine(n_steps, harmonics, amplitude=1.0, iterations=20):
+    """
+    One period of a multisine exciting the given harmonics with equal amplitude.
+
+    Starts from Schroeder phases and lowers the crest factor further by
+    repeatedly clipping the peaks and restoring the amplitude spectrum, keeping
+    only the excited harmonics.
+
+    :param n_steps: Length of the waveform, at most MAX_DAC_STEPS.
+    :param harmonics: Harmonic numbers to excite, see log_harmonics.
+    :param amplitude: Peak value of the returned waveform.
+    :param iterations: Number of clipping iterations, 0 for plain Schroeder phases.
+    """
+    if n_steps > MAX_DAC_STEPS:
+        raise ValueError(f"{n_steps} DAC steps do not fit in the BRAM ({MAX_DAC_STEPS})")
+    harmonics = np.asarray(harmonics)
+    n_lines = len(harmonics)
+    line = np.arange(1, n_lines + 1)
+
+    spectrum = np.zeros(n_steps // 2 + 1, dtype=np.complex128)
+    spectrum[harmonics] = np.exp(-1j * np.pi * line * (line - 1) / n_lines)
+    waveform = np.fft.irfft(spectrum, n_steps)
+
+    for _ in range(iterations):
+        rms = np.sqrt(np.mean(waveform**2))
+        clipped = np.clip(waveform, -1.4 * rms, 1.4 * rms)
+        phases = np.angle(np.fft.rfft(clipped)[harmonics])
+        spectrum[harmonics] = np.exp(1j * phases)
+        waveform = np.fft.irfft(spectrum, n_steps)
+
+    return amplitude * waveform / np.max(np.abs(waveform))
+
+
+def log_chirp(n_steps, dac_sample_rate, start_freq, end_freq, amplitude=1.0):
+    """
+    One period of a logarithmic chirp from start_freq to end_freq.
+
+    The chirp covers all harmonics between the two frequencies, but is not
+    exactly periodic, so analyse it over a single period or accept some leakage.
+    """
+    if n_steps > MAX_DAC_STEPS:
+        raise ValueError(f"{n_steps} DAC steps do not fit in the BRAM ({MAX_DAC_STEPS})")
+    duration = n_steps / dac_sample_rate
+    t = np.arange(n_steps) / dac_sample_rate
+    rate = np.log(end_freq / start_freq) / duration
+    return amplitude * np.sin(2 * np.pi * start_freq * (np.exp(rate * t) - 1) / rate)
+
+
+def adc_samples_per_period(n_steps, dac_sample_rate, adc_sample_rate):
+    """
+    ADC samples per waveform period of n_steps DAC steps.
+
+    The ADC has to sample at least as fast as the DAC steps, with an integer
+    ratio, so that every period holds the same whole number of samples and the
+    harmonics of the waveform land on FFT bins of one period.
+    """
+    ratio = adc_sample_rate / dac_sample_rate
+    if ratio < 1 or abs(ratio - round(ratio)) > 1e-9 * ratio:
+        raise ValueError(
+            f"The ADC sample rate ({adc_sample_rate} Hz) has to be an integer multiple "
+            f"of the DAC sample rate ({dac_sample_rate} Hz)"
+        )
+    return n_steps * round(ratio)
+
+
+def transfer_function(input_signal, output_signal, samples_per_period, harmonics):
+    """
+    Transfer function at the excited harmonics of a periodic excitation.
+
+    Both signals are cut to whole periods and averaged over the periods before
+    one FFT each, so all harmonics come out of a single vectorised pass.
+
+    :param samples_per_period: ADC samples per waveform period, must be an integer.
+
+    :return: Complex transfer function at each harmonic.
+    """
+    samples_per_period = int(samples_per_period)
+    if np.max(harmonics) > samples_per_period // 2:
+        raise ValueError(
+            f"Harmonic {np.max(harmonics)} is above the Nyquist frequency of a "
+            f"{samples_per_period} sample period, see adc_samples_per_period"
+        )
+    periods = min(len(input_signal), len(output_signal)) // samples_per_period
+    if periods == 0:
+        raise ValueError("The captures are shorter than one waveform period")
+    signals = np.stack(
+        [input_signal[:periods * samples_per_period], output_signal[:periods * samples_per_period]]
+    )
+    period_means = signals.reshape(2, periods, samples_per_period).mean(axis=1)
+    spectra = np.fft.rfft(period_means, axis=1)[:, harmonics]
+    return spectra[1] / spectra[0]
@@ -0,0 +1,66 @@
+import numpy as np
+import pytest
+
+from AdcUnpacker import AdcUnpacker, ADC_INPUT_RANGES, pack_adc_words
+
+# Packed words with known codes: channel 1 in the low, channel 2 in the high half word
+KNOWN_WORDS = np.array(
+    [
+        0x0000_0000,  # 0, 0
+        0x2000_1FFF,  # +8191, -8192
+        0x1FFF_2000,  # -8192, +8191
+        0x3FFF_0001,  # +1, -1
+    ],
+    dtype=np.uint32,
+).view(np.int32)
+KNOWN_CODES_CH1 = np.array([0, 8191, -8192, 1])
+KNOWN_CODES_CH2 = np.array([0, -8192, 8191, -1])
+
+
+def test_known_frame():
+    for full_scale_v in ADC_INPUT_RANGES.values():
+        ch1, ch2 = AdcUnpacker(np.float64, full_scale_v).unpack(KNOWN_WORDS)
+        np.testing.assert_allclose(ch1, KNOWN_CODES_CH1 * full_scale_v / 8192)
+        np.testing.assert_allclose(ch2, KNOWN_CODES_CH2 * full_scale_v / 8192)
+
+
+def test_set_full_scale():
+    unpacker = AdcUnpacker(np.float32)
+    low, _ = unpacker.unpack(KNOWN_WORDS)
+    low = low.copy()
+    unpacker.set_full_scale(ADC_INPUT_RANGES["HV (±20 V)"])
+    high, _ = unpacker.unpack(KNOWN_WORDS)
+    np.testing.assert_allclose(high, 20 * low)
+
+
+def test_round_trip():
+    rng = np.random.default_rng(0)
+    for full_scale_v in ADC_INPUT_RANGES.values():
+        ch1 = rng.uniform(-full_scale_v, full_scale_v, 4096)
+        ch2 = rng.uniform(-full_scale_v, full_scale_v, 4096)
+        words = pack_adc_words(ch1, ch2, full_scale_v)
+        out1, out2 = AdcUnpacker(np.float64, full_scale_v).unpack(words)
+        lsb = full_scale_v / 8192
+        assert np.max(np.abs(out1 - ch1)) <= lsb
+        assert np.max(np.abs(out2 - ch2)) <= lsb
+
+
+def test_matches_library_unpacker():
+    unpackADCData = pytest.importorskip("rp.adc.helpers").unpackADCData
+    rng = np.random.default_rng(1)
+    words = rng.integers(-(2**31), 2**31 - 1, 65536, dtype=np.int64).astype(np.int32)
+    # The library unpacker scales to the LV range
+    expected = unpackADCData(words, 1, rawData=False)
+    ch1, ch2 = AdcUnpacker(np.float64, ADC_INPUT_RANGES["LV (±1 V)"]).unpack(words)
+    np.testing.assert_allclose(ch1, np.asarray(expected[0]), atol=1e-9)
+    np.testing.assert_allclose(ch2, np.asarray(expected[1]), atol=1e-9)
+
+    np.testing.assert_allclose(
+        AdcUnpacker(np.float64).unpack(KNOWN_WORDS)[0],
+        np.asarray(unpackADCData(KNOWN_WORDS, 1, rawData=False)[0]),
+        atol=1e-9,
+    )
+
+
+if __name__ == "__main__":
+    raise SystemExit(pytest.main([__file__]))